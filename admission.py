@@ -0,0 +1,234 @@
+from flask import jsonify
+from flask_login import current_user
+from collections import OrderedDict, deque
+from functools import wraps
+import math
+import threading
+import time
+
+# Lower number = served first
+PRIORITIES = {
+    'chat': 0,
+    'quiz': 1,
+}
+
+class Overloaded(Exception):
+    """Raised when a request can't be admitted; carries a Retry-After hint"""
+
+    def __init__(self, retry_after, reason):
+        super().__init__(reason)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+        self.reason = reason
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now=None):
+        """Seconds until a token is available (0 if one is available now)"""
+        self._refill(now or time.monotonic())
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def refund(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def full(self, now):
+        """True once the bucket has refilled; it then behaves like a new one"""
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+class _Waiter:
+    __slots__ = ('granted',)
+
+    def __init__(self):
+        self.granted = False
+
+class AdmissionController:
+    """Admission control for the shared LLM capacity.
+
+    Each (user, task) pair has a token bucket, dropped again once it has been
+    idle long enough to refill. Admitted requests run up to
+    `concurrency` at a time; the rest wait in a bounded queue (with a small
+    per-user share) that is drained by priority and, within a priority,
+    round-robin across users so a single busy user cannot starve the others.
+    """
+
+    def __init__(self, concurrency=4, queue_size=32, per_user_queue=2, queue_timeout=15.0, rates=None):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.per_user_queue = per_user_queue
+        self.queue_timeout = queue_timeout
+        # task -> (requests per minute, burst)
+        self.rates = rates or {'chat': (20, 5), 'quiz': (4, 2)}
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._queued = 0
+        self._waiting = {priority: OrderedDict() for priority in sorted(set(PRIORITIES.values()))}
+        self._buckets = OrderedDict()  # (user_id, task) -> TokenBucket, least recently used first
+        self._service_time = 2.0  # Moving average of seconds per request
+
+    def init_app(self, app):
+        self.concurrency = app.config.setdefault('LLM_CONCURRENCY', self.concurrency)
+        self.queue_size = app.config.setdefault('LLM_QUEUE_SIZE', self.queue_size)
+        self.per_user_queue = app.config.setdefault('LLM_QUEUE_PER_USER', self.per_user_queue)
+        self.queue_timeout = app.config.setdefault('LLM_QUEUE_TIMEOUT', self.queue_timeout)
+        self.rates = app.config.setdefault('LLM_RATE_LIMITS', self.rates)
+
+    def acquire(self, user_id, task):
+        """Block until the request may run, or raise Overloaded"""
+        priority = PRIORITIES[task]
+        with self._cond:
+            bucket = self._bucket(user_id, task)
+            wait = bucket.wait_time()
+            if wait > 0:
+                raise Overloaded(wait, 'rate limited')
+
+            if self._active < self.concurrency and self._queued == 0:
+                bucket.take()
+                self._active += 1
+                return
+
+            if self._queued >= self.queue_size:
+                raise Overloaded(self._estimated_wait(), 'queue full')
+            if self._queued_for(user_id) >= self.per_user_queue:
+                raise Overloaded(self._estimated_wait(), 'too many pending requests')
+
+            bucket.take()
+            waiter = _Waiter()
+            self._waiting[priority].setdefault(user_id, deque()).append(waiter)
+            self._queued += 1
+
+            deadline = time.monotonic() + self.queue_timeout
+            while not waiter.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._withdraw(priority, user_id, waiter)
+                    # The request never ran, so it shouldn't count against the user
+                    bucket.refund()
+                    raise Overloaded(self._estimated_wait(), 'queue timeout')
+                self._cond.wait(remaining)
+
+    def release(self, elapsed=None):
+        with self._cond:
+            self._active -= 1
+            if elapsed is not None:
+                self._service_time = 0.9 * self._service_time + 0.1 * elapsed
+            self._dispatch()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'active': self._active,
+                'queued': self._queued,
+                'concurrency': self.concurrency,
+                'queue_size': self.queue_size,
+                'avg_service_seconds': round(self._service_time, 3)
+            }
+
+    def idle(self):
+        """True when nothing is queued and at least one slot is free"""
+        return self._queued == 0 and self._active < self.concurrency
+
+    def try_acquire_spare(self, reserve=1):
+        """Take a slot for background work only if it leaves `reserve` slots free
+        and nobody is waiting; never queues. Pair with release()."""
+        with self._cond:
+            if self._queued or self._active + reserve >= self.concurrency:
+                return False
+            self._active += 1
+            return True
+
+    def _bucket(self, user_id, task):
+        self._prune_buckets()
+        key = (user_id, task)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            per_minute, burst = self.rates[task]
+            bucket = self._buckets[key] = TokenBucket(per_minute / 60.0, burst)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _prune_buckets(self):
+        """Forget idle buckets that have refilled, starting with the least recently used"""
+        now = time.monotonic()
+        while self._buckets:
+            bucket = next(iter(self._buckets.values()))
+            if not bucket.full(now):
+                break
+            self._buckets.popitem(last=False)
+
+    def _dispatch(self):
+        """Hand free slots to waiters: highest priority first, round-robin by user"""
+        granted = False
+        while self._active < self.concurrency and self._queued:
+            for users in self._waiting.values():
+                if users:
+                    break
+            user_id, waiters = next(iter(users.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                users.move_to_end(user_id)
+            else:
+                del users[user_id]
+            waiter.granted = True
+            self._active += 1
+            self._queued -= 1
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _queued_for(self, user_id):
+        return sum(len(users.get(user_id, ())) for users in self._waiting.values())
+
+    def _withdraw(self, priority, user_id, waiter):
+        waiters = self._waiting[priority].get(user_id)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del self._waiting[priority][user_id]
+            self._queued -= 1
+
+    def _estimated_wait(self):
+        return self._service_time * (self._queued + 1) / max(self.concurrency, 1)
+
+llm_admission = AdmissionController()
+
+def admission_required(task):
+    """Admit a view through the LLM admission controller, answering 429 when overloaded"""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            try:
+                llm_admission.acquire(current_user.id, task)
+            except Overloaded as e:
+                response = jsonify({
+                    'error': "Buddy is helping lots of friends right now. Please try again in a moment!",
+                    'reason': e.reason,
+                    'retry_after': e.retry_after
+                })
+                response.status_code = 429
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+
+            start = time.monotonic()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                llm_admission.release(time.monotonic() - start)
+        return wrapped
+    return decorator
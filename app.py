@@ -1,61 +1,112 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for, flash
+from flask import Flask, Blueprint, request, jsonify, render_template, redirect, url_for, flash
+from flask.cli import with_appcontext
 from flask_cors import CORS
 import os
+import click
 from dotenv import load_dotenv
 from chatbot import Chatbot
 from interactive import InteractiveFeatures
 from models import db, LearningSession, QuizAttempt, User, Achievement, UserAchievement
 from auth import auth, login_manager
 from progress import progress, initialize_achievements, check_quiz_achievements
+from leaderboard import leaderboard, boards
+from export import export
+from admission import llm_admission, admission_required
+from safety import content_filter, ContentBlocked
+from history import history, record_chat_turn, HIDDEN_MESSAGE
+from search import search, create_search_index, index_quiz
+from review import review, build_review_quiz, register_quiz, record_answer
+from recommender import recommend, recommender
+from roster import roster
+from prefetch import prefetch, prefetcher
+from routing import routing, model_router
+from profiling import profiling, request_profiler
+from rooms import rooms, registry as room_registry
 from flask_login import login_required, current_user
 import random
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
+main = Blueprint('main', __name__)
 
-# Configure SQLAlchemy
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///youlearn.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-here')
+# The chatbot and interactive features get their LLM clients from the model router on first use
+chatbot = Chatbot()
+interactive = InteractiveFeatures()
 
-# Initialize extensions
-db.init_app(app)
-login_manager.init_app(app)
+def create_app(config=None):
+    """Create and configure the Flask application"""
+    app = Flask(__name__)
+    CORS(app)
 
-# Configure login manager
-login_manager.login_view = 'auth.login'
-login_manager.login_message = 'Please log in to access this page.'
-login_manager.login_message_category = 'error'
+    # Configure SQLAlchemy
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///youlearn.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-here')
+    app.config['ADMIN_USERNAMES'] = [name.strip() for name in os.getenv('ADMIN_USERNAMES', '').split(',') if name.strip()]
+    if config:
+        app.config.update(config)
 
-# Register blueprints
-app.register_blueprint(auth, url_prefix='/auth')
-app.register_blueprint(progress, url_prefix='/progress')
+    # Initialize extensions
+    db.init_app(app)
+    login_manager.init_app(app)
+    llm_admission.init_app(app)
+    model_router.init_app(app)
+    content_filter.init_app(app)
+    recommender.init_app(app)
+    boards.init_app(app)
+    prefetcher.init_app(app, chatbot, interactive)
+    request_profiler.init_app(app)
+    room_registry.init_app(app, interactive.generate_quiz)
 
-# Create database tables
-with app.app_context():
-    db.create_all()
-    initialize_achievements()  # Initialize default achievements
+    # Configure login manager
+    login_manager.login_view = 'auth.login'
+    login_manager.login_message = 'Please log in to access this page.'
+    login_manager.login_message_category = 'error'
 
-# Initialize the chatbot and interactive features
-chatbot = Chatbot()
-interactive = InteractiveFeatures()
+    # Register blueprints
+    app.register_blueprint(main)
+    app.register_blueprint(auth, url_prefix='/auth')
+    app.register_blueprint(progress, url_prefix='/progress')
+    app.register_blueprint(leaderboard, url_prefix='/leaderboard')
+    app.register_blueprint(export, url_prefix='/export')
+    app.register_blueprint(history, url_prefix='/history')
+    app.register_blueprint(search, url_prefix='/search')
+    app.register_blueprint(review, url_prefix='/review')
+    app.register_blueprint(recommend, url_prefix='/recommendations')
+    app.register_blueprint(roster, url_prefix='/roster')
+    app.register_blueprint(prefetch, url_prefix='/prefetch')
+    app.register_blueprint(routing, url_prefix='/routing')
+    app.register_blueprint(profiling, url_prefix='/profiles')
+    app.register_blueprint(rooms, url_prefix='/rooms')
+
+    app.cli.add_command(init_db_command)
+
+    return app
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create the database tables and seed the default achievements."""
+    db.create_all()
+    create_search_index()
+    initialize_achievements()
+    print("Database initialized.")
 
-@app.route('/')
+@main.route('/')
 def index():
     if current_user.is_authenticated:
         return redirect(url_for('progress.dashboard'))
     return redirect(url_for('auth.login'))
 
-@app.route('/chat')
+@main.route('/chat')
 @login_required
 def chat():
     return render_template('index.html')
 
-@app.route('/send_message', methods=['POST'])
+@main.route('/send_message', methods=['POST'])
 @login_required
+@admission_required('chat')
 def send_message():
     try:
         data = request.json
@@ -64,14 +115,26 @@ def send_message():
         if not message:
             return jsonify({'error': 'No message provided'}), 400
         
+        # Steer away from unsafe topics before anything reaches the LLM
+        match = content_filter.check(message)
+        if match:
+            return _redirected_reply(match)
+        
         # Check if we should generate a quiz
         quiz_mode = interactive.should_generate_quiz(message)
         
-        # Get response from chatbot
-        response = chatbot.get_response(message)
+        # Use a prefetched follow-up if one is ready, otherwise get a response
+        # from the chatbot, scanning the reply as it streams in
+        try:
+            response = prefetcher.take_follow_up(current_user.id, message)
+            if response is None:
+                response = chatbot.get_response(message, scanner=content_filter.scanner())
+        except ContentBlocked as e:
+            print(f"Blocked chatbot output: {e}")
+            return _redirected_reply(e.match, message)
         
-        # Update conversation context
-        interactive.update_conversation_context(message)
+        # Update conversation context; the main topic is stored on the session below
+        topics = interactive.update_conversation_context(message)
         
         # Return response with possible quiz
         result = {'response': response}
@@ -82,26 +145,43 @@ def send_message():
             
         # Generate quiz if in quiz mode
         if quiz_mode:
-            quiz = interactive.generate_quiz()
+            quiz = next_quiz()
             if quiz:
                 result['quiz'] = quiz
         
-        # Record learning session
+        # Record learning session and the chat turn itself
         session = LearningSession(
             user_id=current_user.id,
-            topic="General Chat",
+            topic=topics[0][:100] if topics else "General Chat",
             duration_minutes=1,
             xp_earned=1
         )
         db.session.add(session)
+        record_chat_turn(current_user.id, message, response)
         db.session.commit()
         
+        # Get the likely next reply and quiz ready while the user reads this one
+        prefetcher.schedule(current_user.id, topics[-1] if topics else None)
+        
         return jsonify(result)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/check_answer', methods=['POST'])
+def _redirected_reply(match, message=None):
+    """Answer with a redirect, keeping the turn in the chat history.
+
+    Pass the message only when it was Buddy's reply that got blocked; a
+    flagged message is stored as a placeholder naming the category.
+    """
+    reply = content_filter.redirect_reply()
+    if message is None:
+        message = HIDDEN_MESSAGE.format(category=match.category)
+    record_chat_turn(current_user.id, message, reply, redirected=True, category=match.category)
+    db.session.commit()
+    return jsonify({'response': reply, 'redirected': True})
+
+@main.route('/check_answer', methods=['POST'])
 @login_required
 def check_answer():
     try:
@@ -118,6 +198,10 @@ def check_answer():
         
         is_correct = data['selected_answer'] == data.get('correct_answer', 0)
         
+        # Update the spaced-repetition schedule for this question
+        if data.get('review_key'):
+            record_answer(current_user.id, data['review_key'], is_correct)
+        
         # If it's the last question, record quiz attempt
         if data.get('is_last_question', False):
             quiz_attempt = QuizAttempt(
@@ -144,6 +228,8 @@ def check_answer():
                 'quiz_complete': True
             })
         
+        db.session.commit()
+        
         return jsonify({
             'is_correct': is_correct,
             'message': 'Correct! Great job!' if is_correct else 'Not quite. Try again!'
@@ -152,12 +238,25 @@ def check_answer():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/generate_quiz')
+def next_quiz():
+    """Serve due review questions first, then a prefetched quiz, and only call the LLM when neither is ready"""
+    quiz = build_review_quiz(current_user.id)
+    if quiz:
+        return quiz
+    
+    quiz = prefetcher.take_quiz(current_user.id) or interactive.generate_quiz()
+    if quiz:
+        register_quiz(current_user.id, quiz)
+        index_quiz(current_user.id, quiz)
+    return quiz
+
+@main.route('/generate_quiz')
 @login_required
+@admission_required('quiz')
 def generate_quiz():
     try:
-        # Generate quiz using the conversation context
-        quiz = interactive.generate_quiz()
+        # Review due questions first, otherwise generate from the conversation context
+        quiz = next_quiz()
         
         if quiz:
             # Record a learning session for the quiz generation
@@ -178,4 +277,4 @@ def generate_quiz():
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -1,9 +1,10 @@
-from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash
+from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash, current_app
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from models import db, User
 from datetime import datetime
 from email_validator import validate_email, EmailNotValidError
 from werkzeug.security import generate_password_hash, check_password_hash
+from functools import wraps
 
 auth = Blueprint('auth', __name__)
 login_manager = LoginManager()
@@ -12,10 +13,24 @@ login_manager = LoginManager()
 def load_user(user_id):
     return User.query.get(int(user_id))
 
+def is_admin(user):
+    """Check whether a user is listed in the ADMIN_USERNAMES config"""
+    return user.is_authenticated and user.username in current_app.config.get('ADMIN_USERNAMES', ())
+
+def admin_required(view):
+    """Restrict a view to logged-in admins"""
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if not is_admin(current_user):
+            return jsonify({'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapped
+
 @auth.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('chat'))
+        return redirect(url_for('main.chat'))
     
     if request.method == 'GET':
         return render_template('login.html')
@@ -55,7 +70,7 @@ def login():
                 
                 # Redirect based on referring page
                 next_page = request.args.get('next')
-                return redirect(next_page or url_for('chat'))
+                return redirect(next_page or url_for('main.chat'))
             else:
                 flash('Invalid username or password.', 'error')
         else:
@@ -68,7 +83,7 @@ def login():
 @auth.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for('chat'))
+        return redirect(url_for('main.chat'))
     
     if request.method == 'POST':
         username = request.form.get('username')
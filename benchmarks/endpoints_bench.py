@@ -0,0 +1,230 @@
+"""Time the progress and auth endpoints against synthetic data.
+
+Each case is run for a sample of users, split into several repeats that are
+interleaved across cases, and reports the median p50/p95 over the repeats,
+the spread of the per-repeat p50s and SQL queries per call. Results can be
+saved as a baseline and later runs compared against it, flagging cases whose
+query count or median latency got worse.
+
+Usage:
+    python benchmarks/endpoints_bench.py --scale tiny --save-baseline
+    python benchmarks/endpoints_bench.py --scale tiny --compare
+    python benchmarks/endpoints_bench.py --db /tmp/youlearn-bench.db --scale full --compare
+
+Without --db a scratch database is generated with benchmarks/synthetic.py.
+With --db an existing generated database is reused (--scale then only names
+the baseline file). Baselines live in benchmarks/baselines/<scale>.json;
+latencies are machine-specific, so refresh them on the machine you compare on.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from sqlalchemy import event
+
+from app import create_app
+from models import db, User, QuizAttempt, LearningSession
+from progress import check_quiz_achievements, check_learning_achievements
+from synthetic import SCALES, SYNTHETIC_PASSWORD, generate
+
+BASELINE_DIR = os.path.join(BENCH_DIR, 'baselines')
+
+class QueryCounter:
+    """Counts statements sent to the engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+def _logged_in_client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
+
+def _expect(response, status):
+    if response.status_code != status:
+        raise RuntimeError(f'{response.request.path} returned {response.status_code}, expected {status}')
+
+def build_cases(app, rng):
+    """name -> callable(user_id); requests run outside an app context so
+    flask-login doesn't reuse a user cached on g between calls"""
+
+    def dashboard(user_id):
+        _expect(_logged_in_client(app, user_id).get('/progress/dashboard'), 200)
+
+    def stats(user_id):
+        _expect(_logged_in_client(app, user_id).get('/progress/stats'), 200)
+
+    def login(user_id):
+        response = app.test_client().post('/auth/login', data={
+            'username': f'kid{user_id}', 'password': SYNTHETIC_PASSWORD
+        })
+        # A successful login redirects to the chat page
+        _expect(response, 302)
+        if '/auth/login' in response.headers.get('Location', ''):
+            raise RuntimeError(f'login failed for kid{user_id}')
+
+    def quiz_achievements(user_id):
+        with app.app_context():
+            max_score = 3
+            quiz = QuizAttempt(user_id=user_id, topic=rng.choice(['Math', 'Science', 'Space']),
+                               score=rng.randint(0, max_score), max_score=max_score)
+            check_quiz_achievements(quiz)
+
+    def learning_achievements(user_id):
+        with app.app_context():
+            session = LearningSession(user_id=user_id, topic='Space', duration_minutes=10, xp_earned=5)
+            check_learning_achievements(session)
+
+    return {
+        'progress.dashboard': dashboard,
+        'progress.get_stats': stats,
+        'auth.login': login,
+        'progress.check_quiz_achievements': quiz_achievements,
+        'progress.check_learning_achievements': learning_achievements,
+    }
+
+def run_case(func, user_ids, counter):
+    """One repeat of a case: per-call latencies (ms) and query counts"""
+    latencies, queries = [], []
+    for user_id in user_ids:
+        counter.count = 0
+        start = time.perf_counter()
+        func(user_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+    latencies.sort()
+    return latencies, queries
+
+def summarize(runs):
+    """Median of the per-repeat p50/p95s, so one noisy repeat can't move the result"""
+    p50s = [statistics.median(latencies) for latencies, _ in runs]
+    p95s = [latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] for latencies, _ in runs]
+    latencies = [value for run_latencies, _ in runs for value in run_latencies]
+    queries = [value for _, run_queries in runs for value in run_queries]
+    return {
+        'n': len(latencies),
+        'repeats': len(runs),
+        'p50_ms': round(statistics.median(p50s), 3),
+        'p95_ms': round(statistics.median(p95s), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'p50_runs_ms': [round(value, 3) for value in p50s],
+        'queries': round(statistics.fmean(queries), 2),
+    }
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Print a side-by-side comparison; returns the names of regressed cases
+
+    A case is slower only if its median p50 is past the threshold and the
+    minimum delta, and every repeat's p50 is above every baseline repeat's
+    p50 (if the ranges overlap, the difference is within the noise).
+    """
+    regressions = []
+    print(f"\n{'case':<38} {'base p50':>10} {'p50':>10} {'change':>8} {'base q':>7} {'q':>7}")
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            print(f"{name:<38} {'-':>10} {result['p50_ms']:>10.3f} {'new':>8}")
+            continue
+        change = result['p50_ms'] / base['p50_ms'] - 1 if base['p50_ms'] else 0.0
+        base_runs = base.get('p50_runs_ms') or [base['p50_ms']]
+        slower = (change > threshold and result['p50_ms'] - base['p50_ms'] > min_delta_ms
+                  and min(result['p50_runs_ms']) > max(base_runs))
+        regressed = slower or result['queries'] > base['queries']
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<38} {base['p50_ms']:>10.3f} {result['p50_ms']:>10.3f} {change:>+8.0%} "
+              f"{base['queries']:>7} {result['queries']:>7}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help='Reuse a database made by synthetic.py')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='tiny')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--samples', type=int, default=200, help='Calls per case, over all repeats')
+    parser.add_argument('--repeats', type=int, default=5, help='Interleaved repeats per case')
+    parser.add_argument('--case', action='append', help='Only run these cases (repeatable)')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.20, help='Allowed median p50 slowdown before flagging')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='Ignore median p50 slowdowns smaller than this')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.abspath(args.db) if args.db else os.path.join(tmp, 'bench.db')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path})
+
+        with app.app_context():
+            if not args.db:
+                print(f"generating scale={args.scale} seed={args.seed}")
+                db.create_all()
+                generate(args.scale, seed=args.seed)
+            user_count = db.session.query(db.func.max(User.id)).scalar() or 0
+            counter = QueryCounter(db.engine)
+
+        if not user_count:
+            parser.error('database has no users')
+
+        rng = random.Random(args.seed)
+        user_ids = [rng.randint(1, user_count) for _ in range(args.samples)]
+        cases = build_cases(app, rng)
+        selected = args.case or list(cases)
+
+        # Round-robin over the cases, so a slow patch on the machine hits every
+        # case in one repeat instead of all repeats of one case
+        repeats = max(1, min(args.repeats, len(user_ids)))
+        chunks = [user_ids[index::repeats] for index in range(repeats)]
+        runs = {name: [] for name in selected}
+        for name in selected:
+            for user_id in user_ids[:3]:
+                cases[name](user_id)  # Warm up
+        for chunk in chunks:
+            for name in selected:
+                runs[name].append(run_case(cases[name], chunk, counter))
+
+        results = {}
+        print(f"\n{'case':<38} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p50 spread':>15} {'queries':>8}")
+        for name in selected:
+            result = results[name] = summarize(runs[name])
+            spread = f"{min(result['p50_runs_ms']):.2f}-{max(result['p50_runs_ms']):.2f}"
+            print(f"{name:<38} {result['n']:>5} {result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} "
+                  f"{spread:>15} {result['queries']:>8}")
+
+    baseline_path = os.path.join(BASELINE_DIR, f'{args.scale}.json')
+    regressions = []
+    if args.compare:
+        if not os.path.exists(baseline_path):
+            parser.error(f'no baseline at {baseline_path}; run with --save-baseline first')
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_delta_ms)
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path, 'w') as f:
+            json.dump({'scale': args.scale, 'seed': args.seed, 'samples': args.samples,
+                       'repeats': repeats, 'results': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nsaved baseline to {os.path.relpath(baseline_path)}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark the in-memory leaderboard index with synthetic users.
+
+Usage: python benchmarks/leaderboard_bench.py [--users 1000000] [--seed 42]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leaderboard import RankIndex
+
+def timed(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - start
+    per_op = elapsed / repeat * 1e6
+    print(f"{label:<32} {elapsed:8.3f}s total  {per_op:10.2f}us/op")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--ops', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Skewed XP distribution: most kids have little XP, a few have a lot
+    pairs = [(user_id, int(rng.paretovariate(1.2) * 20)) for user_id in range(1, args.users + 1)]
+    index = RankIndex()
+
+    timed(f"load {args.users} users", lambda: index.load(pairs))
+
+    user_ids = [rng.randint(1, args.users) for _ in range(args.ops)]
+    awards = [rng.randint(1, 25) for _ in range(args.ops)]
+    ops = iter(zip(user_ids, awards))
+
+    def award():
+        user_id, points = next(ops)
+        index.add(user_id, points)
+
+    timed("incremental add_xp", award, repeat=args.ops)
+
+    ranks = iter(user_ids)
+    timed("rank(user)", lambda: index.rank(next(ranks)), repeat=args.ops)
+    timed("top(10)", lambda: index.top(10), repeat=10_000)
+    timed("top(100)", lambda: index.top(100), repeat=1_000)
+
+    # Everyone tied at the same score must not make top-K scan the whole bucket
+    tied = RankIndex()
+    timed(f"load {args.users} tied users", lambda: tied.load((user_id, 0) for user_id in range(1, args.users + 1)))
+    timed("top(10), all tied", lambda: tied.top(10), repeat=10_000)
+    assert [user_id for _, user_id, _ in tied.top(3)] == [1, 2, 3]
+
+    # Sanity check against a full sort on a sample of users
+    ordered = sorted(index._scores.values(), reverse=True)
+    for user_id in user_ids[:100]:
+        xp = index.score(user_id)
+        expected = 1 + sum(1 for value in ordered[:index.rank(user_id)] if value > xp)
+        assert index.rank(user_id) == expected, user_id
+    print("rank check passed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark the spaced-repetition due queue at scale.
+
+Creates the review_items table through the app's models in a scratch SQLite
+database, bulk-loads synthetic items and times the "what's due now" query
+that feeds the quiz path.
+
+Usage: python benchmarks/review_bench.py [--items 20000000] [--users 200000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, ReviewItem
+from review import due_items
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=20_000_000)
+    parser.add_argument('--users', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'review.db')})
+        with app.app_context():
+            db.create_all()
+            # Review items reference users, but SQLite doesn't enforce the FK by default
+            raw = db.engine.raw_connection()
+            raw.execute('PRAGMA synchronous=OFF')
+            insert = (
+                'INSERT INTO review_items (user_id, question_key, topic, question, easiness, '
+                'interval_days, repetitions, lapses, due_at, created_at) '
+                'VALUES (?, ?, ?, ?, 2.5, 1, 1, 0, ?, ?)'
+            )
+            question = '{"question": "Q?", "options": ["a", "b", "c", "d"], "correct_index": 0}'
+
+            start = time.perf_counter()
+            batch = []
+            for i in range(args.items):
+                due = now + timedelta(minutes=rng.randint(-60 * 24 * 30, 60 * 24 * 60))
+                batch.append((rng.randint(1, args.users), f'{i:040x}', 'Topic', question,
+                              due.isoformat(sep=' '), now.isoformat(sep=' ')))
+                if len(batch) >= 100_000:
+                    raw.executemany(insert, batch)
+                    raw.commit()
+                    batch = []
+            if batch:
+                raw.executemany(insert, batch)
+                raw.commit()
+            print(f"loaded {args.items} items in {time.perf_counter() - start:.1f}s")
+
+            plan = raw.execute(
+                'EXPLAIN QUERY PLAN SELECT * FROM review_items WHERE user_id = 1 AND due_at <= ? '
+                'ORDER BY due_at LIMIT 3', (now.isoformat(sep=' '),)
+            ).fetchall()
+            print("plan:", '; '.join(row[-1] for row in plan))
+            raw.close()
+
+            latencies = []
+            for _ in range(args.queries):
+                user_id = rng.randint(1, args.users)
+                start = time.perf_counter()
+                due_items(user_id, now=now)
+                latencies.append((time.perf_counter() - start) * 1000)
+                db.session.expunge_all()
+
+            latencies.sort()
+            print(f"due_items over {args.items} items: p50 {statistics.median(latencies):.3f}ms  "
+                  f"p95 {latencies[int(len(latencies) * 0.95)]:.3f}ms  max {latencies[-1]:.3f}ms")
+
+if __name__ == '__main__':
+    main()
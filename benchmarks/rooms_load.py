@@ -0,0 +1,177 @@
+"""Load test for team quiz rooms.
+
+Plays thousands of rooms at once against the in-memory room registry, with
+a stand-in quiz generator instead of the LLM and in-process subscribers
+instead of HTTP event streams. Every member subscribes to their room; a few
+consumer threads drain streams as they become ready while player threads
+run the games and save results to a temporary SQLite database.
+
+Reports event throughput, fan-out delivery latency, how many times events
+were serialized (should be once per event, not once per subscriber) and the
+cost of the batched end-of-quiz write.
+
+Usage: python benchmarks/rooms_load.py [--rooms 2000] [--members 4]
+Exits non-zero if any attempt or XP award is missing.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rooms as rooms_module
+from app import create_app
+from models import db, User, QuizAttempt
+from rooms import RoomRegistry, save_results, XP_PER_CORRECT, TEAM_XP_MULTIPLIER
+
+def fake_quiz(questions):
+    def generate(topic=None):
+        return {'topic': topic or 'Space', 'questions': [
+            {'question': f'Question {index}?', 'options': ['a', 'b', 'c', 'd'],
+             'correct_index': index % 4, 'explanation': 'Because!'}
+            for index in range(questions)
+        ]}
+    return generate
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, default=2000)
+    parser.add_argument('--members', type=int, default=4)
+    parser.add_argument('--questions', type=int, default=3)
+    parser.add_argument('--players', type=int, default=8, help='Threads playing rooms')
+    parser.add_argument('--consumers', type=int, default=4, help='Threads draining event streams')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    # Count serializations and stamp each shared frame with when it was made
+    encoded = {'broadcast': 0, 'snapshot': 0}
+    made_at = {}
+    original_encode = rooms_module.encode_event
+
+    def counting_encode(event_id, event, payload):
+        frame = original_encode(event_id, event, payload)
+        encoded['snapshot' if event == 'state' else 'broadcast'] += 1
+        made_at[id(frame)] = (time.perf_counter(), frame)
+        return frame
+    rooms_module.encode_event = counting_encode
+
+    # Stand-in for an event loop's readiness notification: a push queues the
+    # stream for its consumer thread instead of consumers polling every stream
+    ready = [queue.SimpleQueue() for _ in range(args.consumers)]
+    original_push = rooms_module.Subscriber.push
+
+    def notifying_push(subscriber, frame):
+        pushed = original_push(subscriber, frame)
+        ready[subscriber.user_id % args.consumers].put(subscriber)
+        return pushed
+    rooms_module.Subscriber.push = notifying_push
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'rooms.db'),
+            'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 60}},
+        })
+        user_count = args.rooms * args.members
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.text('PRAGMA journal_mode=WAL'))
+            db.session.execute(User.__table__.insert(), [
+                {'id': user_id, 'username': f'kid{user_id}', 'email': f'kid{user_id}@example.org',
+                 'password': 'x', 'first_name': f'Kid{user_id}', 'level': 1, 'total_xp': 0}
+                for user_id in range(1, user_count + 1)
+            ])
+            db.session.commit()
+
+        registry = RoomRegistry(quiz_source=fake_quiz(args.questions))
+        start = time.perf_counter()
+        games = []
+        subscribers = []
+        for index in range(args.rooms):
+            members = list(range(index * args.members + 1, (index + 1) * args.members + 1))
+            room = registry.create(members[0], f'Kid{members[0]}')
+            for user_id in members[1:]:
+                room.join(user_id, f'Kid{user_id}')
+            for user_id in members:
+                subscribers.append(room.subscribe(user_id))
+            games.append((room, members))
+        print(f"created {args.rooms} rooms, {len(subscribers)} subscribers in {time.perf_counter() - start:.2f}s")
+
+        delivered = [0] * args.consumers
+        latencies = [[] for _ in range(args.consumers)]
+
+        def consume(slot):
+            while True:
+                subscriber = ready[slot].get()
+                if subscriber is None:
+                    return
+                for frame in subscriber.drain():
+                    delivered[slot] += 1
+                    stamp = made_at.get(id(frame))
+                    if stamp is not None and stamp[1] is frame:
+                        latencies[slot].append((time.perf_counter() - stamp[0]) * 1000)
+
+        save_times = []
+
+        def play(game):
+            room, members = game
+            rng = random.Random(args.seed + members[0])
+            host = members[0]
+            room.start(host)
+            for question_index in range(args.questions):
+                for user_id in members:
+                    room.answer(user_id, question_index, rng.randint(0, 3))
+                if room.advance(host):
+                    with app.app_context():
+                        began = time.perf_counter()
+                        results = save_results(room)
+                        save_times.append((time.perf_counter() - began) * 1000)
+                    room.finish(results)
+
+        consumers = [threading.Thread(target=consume, args=(slot,)) for slot in range(args.consumers)]
+        for thread in consumers:
+            thread.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.players) as pool:
+            list(pool.map(play, games))
+        played = time.perf_counter() - start
+        for slot in range(args.consumers):
+            ready[slot].put(None)
+        for thread in consumers:
+            thread.join()
+
+        with app.app_context():
+            attempts = db.session.query(db.func.count(QuizAttempt.id)).scalar()
+            stored_xp = db.session.query(db.func.sum(User.total_xp)).scalar() or 0
+        expected_xp = sum(
+            sum(room.scores.values()) * XP_PER_CORRECT * TEAM_XP_MULTIPLIER for room, _ in games
+        )
+
+    all_latencies = [value for values in latencies for value in values]
+    frames = sum(delivered)
+    print(f"played {args.rooms} rooms x {args.questions} questions in {played:.2f}s "
+          f"({encoded['broadcast'] / played:,.0f} events/s, {frames / played:,.0f} frames delivered/s)")
+    print(f"serializations: {encoded['broadcast']} broadcast events for {frames - encoded['snapshot']} "
+          f"broadcast deliveries, plus {encoded['snapshot']} per-subscriber snapshots")
+    print(f"delivery latency: p50 {statistics.median(all_latencies):.2f}ms  "
+          f"p95 {percentile(all_latencies, 0.95):.2f}ms  max {max(all_latencies):.2f}ms")
+    print(f"result writes: {len(save_times)} transactions, p50 {statistics.median(save_times):.2f}ms  "
+          f"p95 {percentile(save_times, 0.95):.2f}ms")
+    print(f"quiz attempts stored: {attempts} (expected {user_count}); "
+          f"xp stored: {stored_xp} (expected {expected_xp})")
+
+    if attempts != user_count or stored_xp != expected_xp:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
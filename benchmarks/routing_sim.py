@@ -0,0 +1,138 @@
+"""Drive the model router with a fake provider and check its fallbacks.
+
+Runs on a simulated clock, so it finishes instantly:
+
+1. the primary model is healthy and gets all traffic
+2. its latency degrades past the task's p95 target -> traffic moves to the fallback
+3. it recovers; once the slow samples age out of the window traffic moves back
+4. it starts erroring -> each failed call falls through, then the model is skipped
+5. a stream that fails before its first chunk falls back; a consumer that
+   stops reading early is not counted against the model
+6. a model that is slow on one task (long chat replies) still serves another
+   task it is fast at
+
+Usage: python benchmarks/routing_sim.py
+Exits non-zero if any phase routes to the wrong model.
+"""
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routing import ModelRouter
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+class FakeProvider:
+    """Per-model (or per-model-and-task) latency and failure switches; calls
+    advance the shared clock. The prompt passed to the client is the task name."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.latency = {}
+        self.failing = set()
+
+    def client(self, model_name):
+        provider = self
+
+        class Client:
+            def invoke(self, prompt):
+                provider.clock.now += provider.latency_for(model_name, prompt)
+                if model_name in provider.failing:
+                    raise ConnectionError(f'{model_name} unavailable')
+                return Reply(model_name)
+
+            def stream(self, prompt):
+                provider.clock.now += provider.latency_for(model_name, prompt)
+                if model_name in provider.failing:
+                    raise ConnectionError(f'{model_name} unavailable')
+                for word in ('hello', 'from', model_name):
+                    yield Reply(word)
+
+        return Client()
+
+    def latency_for(self, model_name, task):
+        return self.latency.get((model_name, task), self.latency.get(model_name, 0.5))
+
+def run(router, clock, calls, task='quiz', gap=1.0):
+    served = Counter()
+    for _ in range(calls):
+        served[router.invoke(task, task).content] += 1
+        clock.now += gap
+    return served
+
+def main():
+    clock = Clock()
+    provider = FakeProvider(clock)
+    router = ModelRouter(
+        routes={'quiz': ['big-model', 'small-model'], 'chat': ['big-model', 'small-model'],
+                'topic_extraction': ['big-model', 'small-model']},
+        latency_targets={'quiz': 3.0, 'chat': 3.0, 'topic_extraction': 2.0},
+        window_seconds=60, min_samples=5, max_error_rate=0.25,
+        client_factory=provider.client, clock=clock
+    )
+    failures = []
+
+    def check(name, served, expected):
+        top = served.most_common(1)[0][0]
+        ok = top == expected
+        print(f"{name:<34} {dict(served)}  -> {'ok' if ok else 'WRONG, expected ' + expected}")
+        if not ok:
+            failures.append(name)
+
+    provider.latency = {'big-model': 1.0, 'small-model': 0.3}
+    check('healthy', run(router, clock, 50), 'big-model')
+
+    provider.latency['big-model'] = 6.0
+    run(router, clock, 5)  # Enough slow samples to push p95 over the target
+    check('degraded latency', run(router, clock, 50), 'small-model')
+
+    provider.latency['big-model'] = 1.0
+    clock.now += router.window_seconds + 1
+    check('recovered after window', run(router, clock, 50), 'big-model')
+
+    provider.failing.add('big-model')
+    served = run(router, clock, 50)
+    check('erroring primary', served, 'small-model')
+    print(f"{'':<34} big-model quiz window: {router.stats()['windows']['quiz']['big-model']}")
+
+    provider.failing.discard('big-model')
+    clock.now += router.window_seconds + 1
+    provider.failing.add('big-model')
+    words = [chunk.content for chunk in router.stream('chat', 'chat')]
+    check('stream falls back before chunk 1', Counter([words[-1]]), 'small-model')
+
+    provider.failing.discard('big-model')
+    clock.now += router.window_seconds + 1
+    stream = router.stream('chat', 'chat')
+    next(stream)
+    stream.close()  # Caller stops reading, as when the safety filter blocks a reply
+    samples = router.stats()['windows']['chat']['big-model']['samples']
+    print(f"{'abandoned stream not recorded':<34} samples={samples}  -> {'ok' if samples == 0 else 'WRONG'}")
+    if samples:
+        failures.append('abandoned stream')
+
+    clock.now += router.window_seconds + 1
+    provider.latency = {('big-model', 'chat'): 2.5, ('big-model', 'topic_extraction'): 0.4, 'small-model': 0.3}
+    for _ in range(50):
+        run(router, clock, 1, task='chat', gap=0.5)
+        run(router, clock, 1, task='topic_extraction', gap=0.5)
+    check('slow chat, fast extraction', run(router, clock, 20, task='topic_extraction'), 'big-model')
+
+    if failures:
+        print(f"\n{len(failures)} phase(s) routed wrongly: {', '.join(failures)}")
+        sys.exit(1)
+    print("\nall phases routed as expected")
+
+if __name__ == '__main__':
+    main()
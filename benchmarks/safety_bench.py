@@ -0,0 +1,91 @@
+"""Content filter throughput and accuracy check.
+
+Verifies that every line of data/safety_benign.txt passes and every line of
+data/safety_blocked.txt is caught by check(), does the same for Buddy's
+output with data/safety_output_*.txt and the stream scanner, then measures
+check() and streaming scan throughput. Usage: python benchmarks/safety_bench.py [--megabytes 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from safety import content_filter
+
+def load_samples(name):
+    with open(os.path.join(HERE, 'data', name), encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+def scan(text, chunk):
+    """Feed text through the output scanner in chunks, like a streamed reply"""
+    scanner = content_filter.scanner()
+    for offset in range(0, len(text), chunk):
+        match = scanner.feed(text[offset:offset + chunk])
+        if match:
+            return match
+    return scanner.finish()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--megabytes', type=float, default=5)
+    parser.add_argument('--chunk', type=int, default=16, help='Streamed chunk size in characters')
+    args = parser.parse_args()
+
+    benign = load_samples('safety_benign.txt')
+    blocked = load_samples('safety_blocked.txt')
+
+    false_positives = [(text, content_filter.check(text)) for text in benign if content_filter.check(text)]
+    misses = [text for text in blocked if not content_filter.check(text)]
+    print(f"benign samples:  {len(benign)}, false positives: {len(false_positives)}")
+    for text, match in false_positives:
+        print(f"  FALSE POSITIVE {match}: {text}")
+    print(f"blocked samples: {len(blocked)}, missed: {len(misses)}")
+    for text in misses:
+        print(f"  MISSED: {text}")
+
+    output_benign = load_samples('safety_output_benign.txt')
+    output_blocked = load_samples('safety_output_blocked.txt')
+    for text in output_benign:
+        match = scan(text, args.chunk)
+        if match:
+            false_positives.append((text, match))
+            print(f"  OUTPUT FALSE POSITIVE {match}: {text}")
+    for text in output_blocked:
+        if not scan(text, args.chunk):
+            misses.append(text)
+            print(f"  OUTPUT MISSED: {text}")
+    print(f"output samples:  {len(output_benign)} benign, {len(output_blocked)} blocked")
+
+    # Build a large benign corpus to measure throughput
+    rng = random.Random(7)
+    corpus = []
+    size = 0
+    while size < args.megabytes * 1024 * 1024:
+        line = rng.choice(benign)
+        corpus.append(line)
+        size += len(line.encode('utf-8')) + 1
+
+    start = time.perf_counter()
+    for line in corpus:
+        content_filter.check(line)
+    elapsed = time.perf_counter() - start
+    print(f"check():        {len(corpus) / elapsed:12.0f} msgs/s  {size / elapsed / 1e6:6.2f} MB/s")
+
+    text = ' '.join(corpus)
+    scanner = content_filter.scanner()
+    start = time.perf_counter()
+    for offset in range(0, len(text), args.chunk):
+        scanner.feed(text[offset:offset + args.chunk])
+    scanner.finish()
+    elapsed = time.perf_counter() - start
+    print(f"stream scan:    {len(text) / args.chunk / elapsed:12.0f} chunks/s {size / elapsed / 1e6:6.2f} MB/s")
+
+    if false_positives or misses:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
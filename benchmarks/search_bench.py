@@ -0,0 +1,107 @@
+"""Benchmark the FTS5 search index at scale.
+
+Builds the same FTS5 table the app uses in a scratch SQLite file, fills it
+with synthetic chat/topic/quiz rows spread over many users and times
+per-user ranked snippet queries.
+
+Usage: python benchmarks/search_bench.py [--rows 10000000] [--users 100000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import CREATE_INDEX_SQL, SEARCH_SQL, MARK_OPEN, MARK_CLOSE, build_match_query, owner_token
+
+TOPICS = [
+    'volcanoes', 'earthquakes', 'dinosaurs', 'planets', 'oceans', 'sharks', 'fractions',
+    'pyramids', 'rainforests', 'magnets', 'electricity', 'bees', 'butterflies', 'rockets',
+    'weather', 'rainbows', 'photosynthesis', 'skeletons', 'castles', 'knights',
+]
+WORDS = (
+    'why how what does do the a an is are can tell me about more big small hot cold '
+    'fast slow animals live eat sleep grow fly swim erupt lava rock water air sun moon '
+    'star earth tree leaf seed light sound energy heat ice'
+).split()
+
+def synthetic_rows(count, users, rng):
+    kinds = ['chat', 'learning_session', 'quiz_attempt', 'quiz_question']
+    for ref_id in range(1, count + 1):
+        topic = rng.choice(TOPICS)
+        body = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 30)))
+        yield (
+            f'{body} {topic} {" ".join(rng.choice(WORDS) for _ in range(5))}',
+            owner_token(rng.randint(1, users)),
+            rng.choice(kinds),
+            ref_id,
+            '2024-01-01T00:00:00'
+        )
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='Reuse/keep this database file instead of a temp one')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tmp = None
+    path = args.db
+    if not path:
+        tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp.name, 'search.db')
+
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute(CREATE_INDEX_SQL)
+
+    existing = conn.execute('SELECT count(*) FROM search_index').fetchone()[0]
+    if existing < args.rows:
+        start = time.perf_counter()
+        batch = []
+        for row in synthetic_rows(args.rows - existing, args.users, rng):
+            batch.append(row)
+            if len(batch) >= 50_000:
+                conn.executemany('INSERT INTO search_index VALUES (?, ?, ?, ?, ?)', batch)
+                conn.commit()
+                batch = []
+        if batch:
+            conn.executemany('INSERT INTO search_index VALUES (?, ?, ?, ?, ?)', batch)
+            conn.commit()
+        elapsed = time.perf_counter() - start
+        print(f"indexed {args.rows - existing} rows in {elapsed:.1f}s "
+              f"({(args.rows - existing) / elapsed:.0f} rows/s)")
+
+    # Same SQL the endpoint runs, with SQLAlchemy's :name params
+    sql = str(SEARCH_SQL)
+    latencies = []
+    for _ in range(args.queries):
+        query = build_match_query(rng.randint(1, args.users), rng.choice(TOPICS)[:5])
+        start = time.perf_counter()
+        conn.execute(sql, {'query': query, 'limit': 20, 'offset': 0,
+                            'mark_open': MARK_OPEN, 'mark_close': MARK_CLOSE}).fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    print(f"per-user search over {args.rows} rows: "
+          f"p50 {statistics.median(latencies):.2f}ms  p95 {percentile(latencies, 95):.2f}ms  "
+          f"max {max(latencies):.2f}ms")
+
+    conn.close()
+    if tmp:
+        tmp.cleanup()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Measure cold import, app creation and first-request latency.
+
+Each run happens in a fresh interpreter so module caches do not hide the
+import cost. Usage: python benchmarks/startup_bench.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+app = app_module.create_app({'SQLALCHEMY_DATABASE_URI': sys.argv[1], 'TESTING': True})
+created = time.perf_counter()
+with app.app_context():
+    app_module.db.create_all()
+ready = time.perf_counter()
+response = app.test_client().get('/auth/login')
+first = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (first - ready) * 1000,
+}))
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            uri = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+            output = subprocess.run(
+                [sys.executable, '-c', PROBE, uri],
+                cwd=ROOT, capture_output=True, text=True, check=True,
+                # No API key: startup must not need one
+                env={k: v for k, v in os.environ.items() if k != 'GROQ_API_KEY'}
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    for key in ('import_ms', 'create_app_ms', 'first_request_ms'):
+        values = [r[key] for r in results]
+        print(f"{key:<18} median {statistics.median(values):8.1f}ms   max {max(values):8.1f}ms")
+
+if __name__ == '__main__':
+    main()
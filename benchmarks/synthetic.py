@@ -0,0 +1,223 @@
+"""Seeded, reproducible synthetic data for every table in models.py.
+
+Usage:
+    python benchmarks/synthetic.py --db /tmp/youlearn-bench.db --scale small
+
+The same seed and scale always produce the same rows (timestamps are relative
+to the day of the run). Every user's password
+is SYNTHETIC_PASSWORD so login can be benchmarked. Rows are written with
+Core executemany, so ORM listeners (e.g. the search index) don't run; use
+'flask search rebuild' afterwards if the search index is needed.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+
+from models import (db, User, QuizAttempt, Achievement, UserAchievement, LearningSession,
+                    Activity, ActivityArchive, ReviewItem)
+from history import encode_turn
+from review import question_key
+
+SYNTHETIC_PASSWORD = 'learn-and-play'
+
+# Rows per table. Sessions, quizzes etc. are totals spread over all users.
+SCALES = {
+    'tiny': {'users': 200, 'sessions': 5_000, 'quizzes': 1_000, 'activities': 2_000, 'reviews': 2_000},
+    'small': {'users': 10_000, 'sessions': 500_000, 'quizzes': 100_000, 'activities': 200_000, 'reviews': 200_000},
+    'full': {'users': 100_000, 'sessions': 10_000_000, 'quizzes': 2_000_000, 'activities': 4_000_000, 'reviews': 4_000_000},
+}
+
+TOPICS = [
+    'Animals', 'Space', 'Math', 'Science', 'Geography', 'History', 'Technology', 'Nature',
+    'Art', 'Music', 'Volcanoes', 'Dinosaurs', 'Oceans', 'Fractions', 'Planets', 'Insects',
+    'Weather', 'Human Body', 'Electricity', 'Pyramids', 'General Chat',
+]
+
+ACHIEVEMENTS = [
+    ('First Chat', 'Started your first conversation with Buddy!', 'fa-comments', 10, 'Chat'),
+    ('First Quiz', 'Finished your first quiz!', 'fa-question-circle', 10, 'quiz'),
+    ('Quiz Master', 'Completed 10 quizzes!', 'fa-graduation-cap', 25, 'quiz'),
+    ('Perfect Score', 'Scored 100% on a quiz!', 'fa-star', 20, 'quiz'),
+    ('Math Explorer', 'Took a math quiz!', 'fa-calculator', 10, 'quiz'),
+    ('Science Whiz', 'Took a science quiz!', 'fa-flask', 10, 'quiz'),
+    ('Learning Hour', 'Learned for a whole hour!', 'fa-book', 15, 'learning'),
+    ('Learning Expert', 'Learned for five hours!', 'fa-book', 30, 'learning'),
+    ('Curious Mind', 'Explored three different topics!', 'fa-lightbulb', 15, 'learning'),
+]
+
+BATCH_SIZE = 20_000
+
+def _insert(table, rows):
+    """executemany in batches; rows is any iterable of dicts"""
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(table.insert(), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+        count += len(batch)
+    db.session.commit()
+    return count
+
+def _recent(rng, now, days=60):
+    return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+def generate(scale='tiny', seed=42, now=None, counts=None, log=print):
+    """Fill an empty database with synthetic rows (needs an app context)"""
+    counts = dict(SCALES[scale], **(counts or {}))
+    rng = random.Random(seed)
+    # Timestamps are relative to today so date-windowed views (e.g. the
+    # dashboard's last 14 days) see realistic data on any run date
+    now = now or datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    users = counts['users']
+    password_hash = generate_password_hash(SYNTHETIC_PASSWORD, method='pbkdf2:sha256')
+    started = time.perf_counter()
+
+    def timed(label, table, rows):
+        start = time.perf_counter()
+        inserted = _insert(table, rows)
+        log(f"  {label:<18} {inserted:>10} rows  {time.perf_counter() - start:6.1f}s")
+
+    timed('users', User.__table__, (
+        {
+            'id': user_id,
+            'username': f'kid{user_id}',
+            'email': f'kid{user_id}@example.org',
+            'password': password_hash,
+            'first_name': f'Kid{user_id}',
+            'last_name': None,
+            'age': rng.randint(6, 14),
+            'parent_email': f'parent{user_id}@example.org',
+            'created_at': _recent(rng, now, 365),
+            'last_login': _recent(rng, now, 30),
+            'login_streak': rng.randint(1, 30),
+            'level': 1,
+            'total_xp': 0,
+        }
+        for user_id in range(1, users + 1)
+    ))
+
+    timed('achievements', Achievement.__table__, (
+        {'id': index, 'name': name, 'description': description, 'icon': icon, 'points': points, 'category': category}
+        for index, (name, description, icon, points, category) in enumerate(ACHIEVEMENTS, start=1)
+    ))
+
+    def user_achievements():
+        for user_id in range(1, users + 1):
+            for achievement_id in rng.sample(range(1, len(ACHIEVEMENTS) + 1), rng.randint(0, 4)):
+                yield {'user_id': user_id, 'achievement_id': achievement_id, 'earned_at': _recent(rng, now, 180)}
+    timed('user_achievements', UserAchievement.__table__, user_achievements())
+
+    # Activity is skewed: 10% of rows belong to the busiest 1% of users
+    hot_users = max(1, users // 100)
+
+    def pick_user():
+        return rng.randint(1, hot_users) if rng.random() < 0.1 else rng.randint(1, users)
+
+    timed('learning_sessions', LearningSession.__table__, (
+        {
+            'user_id': pick_user(),
+            'topic': rng.choice(TOPICS),
+            'duration_minutes': rng.randint(1, 30),
+            'xp_earned': rng.randint(1, 20),
+            'created_at': _recent(rng, now),
+        }
+        for _ in range(counts['sessions'])
+    ))
+
+    def quiz_attempts():
+        for _ in range(counts['quizzes']):
+            max_score = rng.choice([3, 3, 3, 5])
+            yield {
+                'user_id': pick_user(),
+                'topic': rng.choice(TOPICS),
+                'score': rng.randint(0, max_score),
+                'max_score': max_score,
+                'created_at': _recent(rng, now),
+            }
+    timed('quiz_attempts', QuizAttempt.__table__, quiz_attempts())
+
+    def activities():
+        for _ in range(counts['activities']):
+            topic = rng.choice(TOPICS)
+            content, codec = encode_turn(f'Tell me about {topic.lower()}!',
+                                         f'{topic} are amazing! Here is a fun fact... 🌟')
+            yield {
+                'user_id': pick_user(),
+                'activity_type': 'chat',
+                'xp_earned': 0,
+                'created_at': _recent(rng, now),
+                'content': content,
+                'activity_metadata': {'codec': codec, 'redirected': False},
+            }
+    timed('activities', Activity.__table__, activities())
+
+    def archives():
+        for user_id in range(1, min(users, 1000) + 1):
+            lines = '\n'.join(json.dumps({'id': 0, 'user': 'hi', 'buddy': 'hello!'}) for _ in range(20))
+            yield {
+                'user_id': user_id, 'activity_type': 'chat', 'month': '2024-12', 'item_count': 20,
+                'data': zlib.compress(lines.encode('utf-8'), 9), 'created_at': now,
+            }
+    timed('activity_archives', ActivityArchive.__table__, archives())
+
+    def review_items():
+        for index in range(counts['reviews']):
+            user_id = pick_user()
+            topic = rng.choice(TOPICS)
+            question = {'question': f'{topic} question {index}?', 'options': ['a', 'b', 'c', 'd'],
+                        'correct_index': rng.randint(0, 3), 'explanation': 'Because!'}
+            yield {
+                'user_id': user_id, 'question_key': question_key(topic, question), 'topic': topic, 'question': question,
+                'easiness': round(rng.uniform(1.3, 2.8), 2), 'interval_days': rng.randint(1, 60),
+                'repetitions': rng.randint(0, 8), 'lapses': rng.randint(0, 3),
+                'due_at': now + timedelta(days=rng.randint(-30, 60)),
+                'last_reviewed_at': _recent(rng, now), 'created_at': _recent(rng, now, 120),
+            }
+    timed('review_items', ReviewItem.__table__, review_items())
+
+    # Totals consistent with the sessions, as User.add_xp would have produced
+    db.session.execute(db.text(
+        "UPDATE users SET total_xp = COALESCE((SELECT SUM(xp_earned) FROM learning_sessions "
+        "WHERE learning_sessions.user_id = users.id), 0)"
+    ))
+    db.session.execute(db.text("UPDATE users SET level = 1 + total_xp / 100"))
+    # One ledger entry per session, so the weekly leaderboard has the same history
+    db.session.execute(db.text(
+        "INSERT INTO xp_awards (user_id, points, created_at) "
+        "SELECT user_id, xp_earned, created_at FROM learning_sessions WHERE xp_earned > 0"
+    ))
+    db.session.commit()
+    log(f"generated scale={scale} seed={seed} in {time.perf_counter() - started:.1f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', required=True, help='SQLite file to create (must not exist)')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='tiny')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        parser.error(f'{args.db} already exists')
+
+    from app import create_app
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.abspath(args.db)})
+    with app.app_context():
+        db.create_all()
+        generate(args.scale, seed=args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Concurrency stress test for XP awards.
+
+Several threads award XP to the same few users at once, first with the old
+read-modify-write in Python and then with User.add_xp's atomic SQL increment.
+Reports throughput and how much XP each approach lost.
+
+Usage: python benchmarks/xp_stress.py [--threads 8] [--awards 250] [--users 1]
+Exits non-zero if User.add_xp loses any XP or leaves a wrong level.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, User, XP_PER_LEVEL, MAX_LEVEL
+
+def legacy_add_xp(user, points):
+    """The previous User.add_xp: read-modify-write in Python, then commit"""
+    user.total_xp += points
+    new_level = 1 + (user.total_xp // 100)
+    if new_level > user.level:
+        user.level = new_level
+    db.session.commit()
+
+def atomic_add_xp(user, points):
+    user.add_xp(points)
+    db.session.commit()
+
+def run(app, award, user_ids, threads, awards, seed):
+    with app.app_context():
+        db.session.execute(db.update(User).values(total_xp=0, level=1))
+        db.session.commit()
+
+    expected = {user_id: 0 for user_id in user_ids}
+    expected_lock = threading.Lock()
+    errors = []
+    start_line = threading.Barrier(threads)
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        with app.app_context():
+            start_line.wait()
+            for _ in range(awards):
+                user_id = rng.choice(user_ids)
+                points = rng.randint(1, 20)
+                try:
+                    award(db.session.get(User, user_id), points)
+                except Exception as e:
+                    db.session.rollback()
+                    errors.append(str(e))
+                    continue
+                with expected_lock:
+                    expected[user_id] += points
+
+    pool = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        actual = dict(db.session.query(User.id, User.total_xp).filter(User.id.in_(user_ids)))
+        wrong_levels = db.session.query(User).filter(User.id.in_(user_ids)).all()
+        wrong_levels = [user.id for user in wrong_levels if user.level != min(user.total_xp // XP_PER_LEVEL + 1, MAX_LEVEL)]
+
+    return {
+        'elapsed': elapsed,
+        'committed': threads * awards - len(errors),
+        'errors': len(errors),
+        'expected': sum(expected.values()),
+        'actual': sum(actual.values()),
+        'wrong_levels': wrong_levels,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--awards', type=int, default=250, help='Awards per thread')
+    parser.add_argument('--users', type=int, default=1, help='Users sharing the awards (fewer = more contention)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'xp.db'),
+            # Wait for the write lock rather than failing straight away
+            'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 30}},
+        })
+        with app.app_context():
+            db.create_all()
+            for index in range(args.users):
+                db.session.add(User(username=f'kid{index}', email=f'kid{index}@example.org', _password='x',
+                                    first_name=f'Kid{index}', total_xp=0, level=1))
+            db.session.commit()
+            user_ids = [user_id for (user_id,) in db.session.query(User.id)]
+
+        print(f"{args.threads} threads x {args.awards} awards over {args.users} user(s)\n")
+        print(f"{'method':<22} {'awards/s':>9} {'errors':>7} {'expected xp':>12} {'stored xp':>10} {'lost':>8} {'bad levels':>11}")
+        results = {}
+        for name, award in (('read-modify-write', legacy_add_xp), ('atomic add_xp', atomic_add_xp)):
+            result = results[name] = run(app, award, user_ids, args.threads, args.awards, args.seed)
+            lost = result['expected'] - result['actual']
+            print(f"{name:<22} {result['committed'] / result['elapsed']:>9.0f} {result['errors']:>7} "
+                  f"{result['expected']:>12} {result['actual']:>10} {lost:>8} {len(result['wrong_levels']):>11}")
+
+    atomic = results['atomic add_xp']
+    if atomic['expected'] != atomic['actual'] or atomic['wrong_levels']:
+        print("\natomic add_xp lost XP or left a wrong level")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
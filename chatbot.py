@@ -1,26 +1,13 @@
-from langchain_groq import ChatGroq
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import ConversationChain
-from langchain.prompts import PromptTemplate
-import os
+import threading
 from dotenv import load_dotenv
+from safety import ContentBlocked
+from routing import model_router
 
 # Load environment variables
 load_dotenv()
 
-class Chatbot:
-    def __init__(self):
-        # Initialize the Groq LLM
-        self.llm = ChatGroq(
-            groq_api_key=os.getenv("GROQ_API_KEY"),
-            model_name="mixtral-8x7b-32768"
-        )
-        
-        # Create a conversation memory
-        self.memory = ConversationBufferMemory()
-        
-        # Create a custom prompt template for kid-friendly responses
-        template = """You are a friendly, enthusiastic, and patient AI tutor named Buddy designed specifically for children. Your role is to:
+# Custom prompt template for kid-friendly responses
+TEMPLATE = """You are a friendly, enthusiastic, and patient AI tutor named Buddy designed specifically for children. Your role is to:
 
 1. Use simple, age-appropriate language that children can easily understand
 2. Make learning fun by incorporating playful elements, jokes, and engaging examples
@@ -41,29 +28,90 @@ Current conversation:
 {history}
 Human: {input}
 Assistant: """
-        
-        # Create the prompt template
-        self.prompt = PromptTemplate(
-            input_variables=["history", "input"],
-            template=template
-        )
-        
-        # Create the conversation chain
-        self.conversation = ConversationChain(
-            llm=self.llm,
-            memory=self.memory,
-            prompt=self.prompt,
-            verbose=True
-        )
+
+class Chatbot:
+    def __init__(self):
+        # Memory is built on first use and the LLM client is picked per call
+        # by the model router, so importing and constructing the chatbot
+        # stays cheap and needs no API key
+        self._ready = False
+        self._lock = threading.Lock()
+        # Bumped every time memory changes; a reply predicted ahead of time
+        # is only valid while memory is still at the turn it was made on
+        self.turns = 0
+        self._memory_lock = threading.Lock()
+
+    def _setup(self):
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+
+            from langchain.memory import ConversationBufferMemory
+            from langchain.prompts import PromptTemplate
+
+            # Create a conversation memory
+            self.memory = ConversationBufferMemory()
+            
+            # Create the prompt template
+            self.prompt = PromptTemplate(
+                input_variables=["history", "input"],
+                template=TEMPLATE
+            )
+            self._ready = True
     
-    def get_response(self, user_input):
+    def get_response(self, user_input, scanner=None):
         """
-        Get a response from the chatbot based on user input
+        Get a response from the chatbot based on user input.
+
+        The reply is streamed from the LLM; if a safety scanner is given each
+        chunk is checked as it arrives and ContentBlocked is raised as soon as
+        anything unsafe shows up, without storing the reply in memory.
         """
         try:
-            # Get the response from the conversation chain
-            response = self.conversation.predict(input=user_input)
-            return response.strip()
+            response = self._generate(user_input, scanner)
+            self.remember(user_input, response)
+            return response
+        except ContentBlocked:
+            raise
         except Exception as e:
             print(f"Error getting response: {str(e)}")
             raise e
+
+    def predict(self, user_input, scanner=None):
+        """
+        Generate the reply to a message the user hasn't sent yet.
+
+        Memory is left untouched; returns (response, turn) so the reply can be
+        committed with remember() if the user does send that message.
+        """
+        self._setup()
+        turn = self.turns
+        return self._generate(user_input, scanner), turn
+
+    def remember(self, user_input, response, turn=None):
+        """Store an exchange in memory; with a turn, only if memory hasn't moved on since"""
+        with self._memory_lock:
+            if turn is not None and turn != self.turns:
+                return False
+            self.memory.save_context({'input': user_input}, {'response': response})
+            self.turns += 1
+            return True
+
+    def _generate(self, user_input, scanner):
+        self._setup()
+        history = self.memory.load_memory_variables({})['history']
+        prompt = self.prompt.format(history=history, input=user_input)
+
+        chunks = []
+        for chunk in model_router.stream('chat', prompt):
+            chunks.append(chunk.content)
+            match = scanner.feed(chunk.content) if scanner else None
+            if match:
+                raise ContentBlocked(match)
+        match = scanner.finish() if scanner else None
+        if match:
+            raise ContentBlocked(match)
+
+        return ''.join(chunks).strip()
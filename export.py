@@ -0,0 +1,133 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_login import login_required, current_user
+from models import db, LearningSession, QuizAttempt, UserAchievement
+from auth import is_admin
+from datetime import datetime
+import click
+import csv
+import io
+import json
+import sys
+import zlib
+
+export = Blueprint('export', __name__)
+
+# Exportable tables and the columns written for each (id must come first)
+EXPORTS = {
+    'sessions': (LearningSession, ['id', 'user_id', 'topic', 'duration_minutes', 'xp_earned', 'created_at']),
+    'quizzes': (QuizAttempt, ['id', 'user_id', 'topic', 'score', 'max_score', 'created_at']),
+    'achievements': (UserAchievement, ['id', 'user_id', 'achievement_id', 'earned_at']),
+}
+FORMATS = ('jsonl', 'csv')
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+def iter_rows(table, user_id=None, batch_size=BATCH_SIZE):
+    """Yield rows of a table as dicts, one keyset-paginated batch at a time"""
+    model, columns = EXPORTS[table]
+    fields = [getattr(model, column) for column in columns]
+    last_id = 0
+
+    while True:
+        query = db.session.query(*fields).filter(model.id > last_id)
+        if user_id is not None:
+            query = query.filter(model.user_id == user_id)
+        batch = query.order_by(model.id).limit(batch_size).all()
+        if not batch:
+            break
+
+        for row in batch:
+            yield {
+                column: value.isoformat() if isinstance(value, datetime) else value
+                for column, value in zip(columns, row)
+            }
+        last_id = batch[-1][0]
+
+def iter_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+def iter_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, when there were no rows
+    if buffer.getvalue():
+        yield buffer.getvalue()
+
+def iter_gzip(lines, chunk_size=CHUNK_SIZE):
+    """Compress text lines into gzip chunks of roughly chunk_size bytes"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    pending = []
+    pending_size = 0
+
+    for line in lines:
+        data = compressor.compress(line.encode('utf-8'))
+        if data:
+            pending.append(data)
+            pending_size += len(data)
+        if pending_size >= chunk_size:
+            yield b''.join(pending)
+            pending = []
+            pending_size = 0
+
+    pending.append(compressor.flush())
+    yield b''.join(pending)
+
+def export_stream(table, fmt, user_id=None):
+    """Gzip-compressed JSONL or CSV dump of a table"""
+    rows = iter_rows(table, user_id=user_id)
+    if fmt == 'csv':
+        lines = iter_csv(rows, EXPORTS[table][1])
+    else:
+        lines = iter_jsonl(rows)
+    return iter_gzip(lines)
+
+@export.route('/<table>.<fmt>')
+@login_required
+def download(table, fmt):
+    """Stream an export of the current user's data.
+
+    Admins can pass ?user_id=N for another user or ?all=1 for the whole platform.
+    """
+    if table not in EXPORTS or fmt not in FORMATS:
+        return jsonify({'error': f'Unknown export: {table}.{fmt}'}), 404
+
+    user_id = current_user.id
+    # ?all=0 or ?all=false must not mean "everyone"
+    export_all = request.args.get('all', False, type=lambda value: value.lower() in ('1', 'true', 'yes'))
+    if export_all or request.args.get('user_id'):
+        if not is_admin(current_user):
+            return jsonify({'error': 'Admin access required'}), 403
+        user_id = None if export_all else request.args.get('user_id', type=int)
+        if user_id is None and not export_all:
+            # Don't let a mistyped id fall through to "everyone"
+            return jsonify({'error': 'user_id must be an integer'}), 400
+
+    scope = 'all' if user_id is None else f'user-{user_id}'
+    filename = f"{table}-{scope}-{datetime.utcnow().strftime('%Y%m%d')}.{fmt}.gz"
+    return Response(
+        stream_with_context(export_stream(table, fmt, user_id=user_id)),
+        mimetype='application/gzip',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@export.cli.command('dump')
+@click.argument('table', type=click.Choice(sorted(EXPORTS)))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default='jsonl')
+@click.option('--user-id', type=int, default=None, help='Only export this user.')
+@click.option('--output', '-o', default='-', help='Output file (default: stdout).')
+def dump_command(table, fmt, user_id, output):
+    """Write a gzip-compressed export of TABLE."""
+    out = sys.stdout.buffer if output == '-' else open(output, 'wb')
+    try:
+        for chunk in export_stream(table, fmt, user_id=user_id):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
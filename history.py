@@ -0,0 +1,215 @@
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+from models import db, Activity, ActivityArchive
+from flask.signals import Namespace
+from datetime import datetime, timedelta
+import base64
+import click
+import json
+import zlib
+
+history = Blueprint('history', __name__)
+
+CHAT = 'chat'
+CODEC = 'zlib+b64'
+PLAIN_CODEC = 'json'
+# zlib's header and base64's 4/3 overhead make short turns bigger, so only
+# long turns are compressed (and only when that actually saves space); the
+# monthly archive blobs are where most of the compression happens
+COMPRESS_MIN_BYTES = 512
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+ARCHIVE_BATCH_SIZE = 1000
+# Stored instead of a message the content filter flagged, which may hold an
+# address or phone number that must not reach history, search or exports
+HIDDEN_MESSAGE = '[message hidden: {category}]'
+
+# Sent inside the archiving transaction with the user's id as sender, so
+# anything keyed on the live rows (e.g. the search index) can follow them
+history_signals = Namespace()
+chats_archived = history_signals.signal('chats-archived')
+
+def compress_text(text):
+    """Compress text for storage in a Text column"""
+    return base64.b64encode(zlib.compress(text.encode('utf-8'), 6)).decode('ascii')
+
+def decompress_text(data):
+    return zlib.decompress(base64.b64decode(data)).decode('utf-8')
+
+def encode_turn(message, response):
+    """Serialize a chat turn; returns (content, codec)"""
+    turn = json.dumps({'user': message, 'buddy': response}, ensure_ascii=False)
+    if len(turn) >= COMPRESS_MIN_BYTES:
+        compressed = compress_text(turn)
+        if len(compressed) < len(turn.encode('utf-8')):
+            return compressed, CODEC
+    return turn, PLAIN_CODEC
+
+def record_chat_turn(user_id, message, response, redirected=False, category=None):
+    """Store a chat turn as an Activity, compressed if that helps (the caller commits)"""
+    content, codec = encode_turn(message, response)
+    metadata = {'codec': codec, 'redirected': redirected}
+    if category:
+        metadata['category'] = category
+    activity = Activity(
+        user_id=user_id,
+        activity_type=CHAT,
+        content=content,
+        activity_metadata=metadata
+    )
+    db.session.add(activity)
+    return activity
+
+def decode_turn(activity_id, created_at, content, metadata):
+    """Turn a stored chat Activity back into a dict"""
+    metadata = metadata or {}
+    codec = metadata.get('codec')
+    if codec == CODEC:
+        turn = json.loads(decompress_text(content))
+    elif codec == PLAIN_CODEC:
+        turn = json.loads(content)
+    else:
+        turn = {'user': content, 'buddy': None}
+    turn.update({
+        'id': activity_id,
+        'created_at': created_at.isoformat(),
+        'redirected': metadata.get('redirected', False),
+        'category': metadata.get('category')
+    })
+    return turn
+
+def encode_cursor(created_at, activity_id):
+    return f"{created_at.isoformat()}_{activity_id}"
+
+def decode_cursor(cursor):
+    created_at, activity_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(created_at), int(activity_id)
+
+@history.route('')
+@login_required
+def get_history():
+    """Return chat turns newest first, paginated by an opaque `before` cursor"""
+    try:
+        limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+        query = db.session.query(
+            Activity.id, Activity.created_at, Activity.content, Activity.activity_metadata
+        ).filter(
+            Activity.user_id == current_user.id,
+            Activity.activity_type == CHAT
+        )
+
+        cursor = request.args.get('before')
+        if cursor:
+            try:
+                created_at, activity_id = decode_cursor(cursor)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            # Keyset condition as a row value, so the cursor is where the index
+            # range scan starts instead of a filter on every newer row
+            query = query.filter(db.tuple_(Activity.created_at, Activity.id) < (created_at, activity_id))
+
+        rows = query.order_by(Activity.created_at.desc(), Activity.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        return jsonify({
+            'turns': [decode_turn(*row) for row in rows],
+            'next_cursor': encode_cursor(rows[-1][1], rows[-1][0]) if has_more else None
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@history.route('/archive')
+@login_required
+def list_archives():
+    archives = ActivityArchive.query.filter_by(user_id=current_user.id, activity_type=CHAT)\
+        .order_by(ActivityArchive.month.desc()).all()
+    return jsonify({'archives': [archive.to_dict() for archive in archives]})
+
+@history.route('/archive/<month>')
+@login_required
+def get_archive(month):
+    archive = ActivityArchive.query.filter_by(
+        user_id=current_user.id, activity_type=CHAT, month=month
+    ).first()
+    if not archive:
+        return jsonify({'error': 'No archive for that month'}), 404
+    return jsonify({'month': month, 'turns': read_archive(archive)})
+
+def read_archive(archive):
+    lines = zlib.decompress(archive.data).decode('utf-8').splitlines()
+    return [json.loads(line) for line in lines if line]
+
+def _flush_month(user_id, month, turns, ids):
+    """Merge a month of turns into its archive blob and delete the live rows"""
+    archive = ActivityArchive.query.filter_by(user_id=user_id, activity_type=CHAT, month=month).first()
+    if archive is None:
+        archive = ActivityArchive(user_id=user_id, activity_type=CHAT, month=month, item_count=0)
+        db.session.add(archive)
+        existing = []
+    else:
+        existing = read_archive(archive)
+
+    merged = existing + turns
+    payload = '\n'.join(json.dumps(turn, ensure_ascii=False) for turn in merged)
+    # One zlib stream per month compresses far better than row-by-row
+    archive.data = zlib.compress(payload.encode('utf-8'), 9)
+    archive.item_count = len(merged)
+
+    Activity.query.filter(Activity.id.in_(ids)).delete(synchronize_session=False)
+    chats_archived.send(user_id, month=month, ids=ids)
+    db.session.commit()
+
+def archive_chats(cutoff):
+    """Move chat turns created before `cutoff` into per-month archives.
+
+    Rows are read in (user_id, created_at, id) keyset order, so each
+    user-month arrives contiguously and is flushed as soon as it ends.
+    """
+    last_key = None
+    group = None
+    turns, ids = [], []
+    archived = 0
+
+    while True:
+        query = db.session.query(
+            Activity.user_id, Activity.id, Activity.created_at, Activity.content, Activity.activity_metadata
+        ).filter(Activity.activity_type == CHAT, Activity.created_at < cutoff)
+        if last_key:
+            user_id, created_at, activity_id = last_key
+            query = query.filter(
+                db.tuple_(Activity.user_id, Activity.created_at, Activity.id) > (user_id, created_at, activity_id)
+            )
+        rows = query.order_by(Activity.user_id, Activity.created_at, Activity.id)\
+            .limit(ARCHIVE_BATCH_SIZE).all()
+        if not rows:
+            break
+
+        for user_id, activity_id, created_at, content, metadata in rows:
+            key = (user_id, created_at.strftime('%Y-%m'))
+            if group is not None and key != group:
+                _flush_month(group[0], group[1], turns, ids)
+                archived += len(ids)
+                turns, ids = [], []
+            group = key
+            turns.append(decode_turn(activity_id, created_at, content, metadata))
+            ids.append(activity_id)
+        last_row = rows[-1]
+        last_key = (last_row[0], last_row[2], last_row[1])
+
+    if group is not None:
+        _flush_month(group[0], group[1], turns, ids)
+        archived += len(ids)
+    return archived
+
+@history.cli.command('archive')
+@click.option('--older-than-days', default=90, show_default=True,
+              help='Archive whole months that ended at least this many days ago.')
+def archive_command(older_than_days):
+    """Pack old chat turns into compressed per-month archives."""
+    # Only archive complete months, so a month is never split across live rows and its blob
+    cutoff = (datetime.utcnow() - timedelta(days=older_than_days)).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    archived = archive_chats(cutoff)
+    print(f"Archived {archived} chat turns created before {cutoff.date()}.")
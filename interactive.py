@@ -1,24 +1,18 @@
 import random
 import json
-from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
-import os
 import ast
+from safety import content_filter
+from routing import model_router
 
 class InteractiveFeatures:
     def __init__(self):
         # Store conversation context
         self.conversation_topics = []
-        # Initialize Groq LLM
-        self.llm = ChatGroq(
-            groq_api_key=os.getenv('GROQ_API_KEY'),
-            model_name="mixtral-8x7b-32768"
-        )
         
     def update_conversation_context(self, message):
-        """Update the conversation context with new topics"""
+        """Update the conversation context with new topics and return the topics found"""
         try:
-            # Use Groq to extract topics from the conversation
+            # Use the LLM to extract topics from the conversation
             prompt = f"""
             Extract the main educational topics from this message:
             "{message}"
@@ -26,21 +20,25 @@ class InteractiveFeatures:
             Return only the topics as a comma-separated list. If no educational topics are found, return "general conversation".
             """
             
-            response = self.llm.invoke(prompt)
+            response = model_router.invoke('topic_extraction', prompt)
             topics = response.content.strip().split(',')
             
             # Add topics to conversation context (max 5 recent topics)
+            found = []
             for topic in topics:
                 topic = topic.strip()
                 if topic and topic != "general conversation":
+                    found.append(topic)
                     if topic not in self.conversation_topics:
                         self.conversation_topics.append(topic)
             
             # Keep only the 5 most recent topics
             self.conversation_topics = self.conversation_topics[-5:]
+            return found
             
         except Exception as e:
             print(f"Error updating conversation context: {str(e)}")
+            return []
 
     def should_generate_quiz(self, message):
         """Determine if we should generate a quiz based on the message"""
@@ -64,11 +62,13 @@ class InteractiveFeatures:
         
         return direct_requests or phrase_requests
 
-    def generate_quiz(self):
-        """Generate a quiz based on conversation context or a random educational topic"""
+    def generate_quiz(self, topic=None):
+        """Generate a quiz on the given topic, the conversation context or a random educational topic"""
         try:
             # Determine quiz topic
-            if self.conversation_topics:
+            if topic:
+                topic = topic.strip()
+            elif self.conversation_topics:
                 topic = random.choice(self.conversation_topics)
             else:
                 # Default topics if no conversation context
@@ -106,7 +106,7 @@ class InteractiveFeatures:
             8. Return only valid JSON
             """
             
-            response = self.llm.invoke(prompt)
+            response = model_router.invoke('quiz', prompt)
             
             # Extract JSON from response
             import json
@@ -117,6 +117,12 @@ class InteractiveFeatures:
             if json_match:
                 json_str = json_match.group(1)
                 quiz_data = json.loads(json_str)
+                
+                # Never show a quiz that trips the content filter
+                match = content_filter.check_output(json.dumps(quiz_data, ensure_ascii=False))
+                if match:
+                    print(f"Discarding quiz with blocked content ({match.category})")
+                    return None
                 return quiz_data
             else:
                 raise ValueError("Could not extract valid JSON from the quiz response")
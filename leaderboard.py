@@ -0,0 +1,375 @@
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+from models import db, User, XpAward, xp_awarded
+from datetime import datetime, timedelta
+from bisect import bisect_left, insort
+import threading
+import time
+
+leaderboard = Blueprint('leaderboard', __name__)
+
+# Age bands used for the per-band boards (inclusive ranges)
+AGE_BANDS = [(6, 8), (9, 11), (12, 14)]
+BAND_NAMES = [f'{low}-{high}' for low, high in AGE_BANDS] + ['other']
+MAX_LIMIT = 100
+
+def age_band(age):
+    """Return the leaderboard band name for an age, e.g. '9-11'"""
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        return 'other'
+    for low, high in AGE_BANDS:
+        if low <= age <= high:
+            return f'{low}-{high}'
+    return 'other'
+
+def week_start(now=None):
+    """Return midnight of the Monday starting the current week"""
+    now = now or datetime.utcnow()
+    monday = now - timedelta(days=now.weekday())
+    return monday.replace(hour=0, minute=0, second=0, microsecond=0)
+
+class RankIndex:
+    """In-memory XP ranking.
+
+    Users are grouped into buckets by XP, each kept sorted by user id, and a
+    Fenwick tree over XP values counts users per value, so "my rank" is
+    O(log max_xp) and top-K only touches the K best entries, even when
+    millions of users are tied.
+    """
+
+    def __init__(self, capacity=1024):
+        self._scores = {}    # user_id -> xp
+        self._buckets = {}   # xp -> sorted list of user ids
+        self._values = []    # distinct xp values, ascending
+        self._tree = [0] * (capacity + 1)
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, user_id):
+        return user_id in self._scores
+
+    def score(self, user_id):
+        return self._scores.get(user_id)
+
+    def load(self, pairs):
+        """Bulk load (user_id, xp) pairs, replacing the current contents"""
+        self._scores = {}
+        self._buckets = {}
+        for user_id, xp in pairs:
+            xp = max(int(xp or 0), 0)
+            self._scores[user_id] = xp
+            self._buckets.setdefault(xp, []).append(user_id)
+        for bucket in self._buckets.values():
+            bucket.sort()
+        self._values = sorted(self._buckets)
+        top = self._values[-1] if self._values else 0
+        self._rebuild_tree(max(len(self._tree) - 1, top + 1))
+
+    def set(self, user_id, xp):
+        """Insert a user or move them to a new XP value"""
+        xp = max(int(xp or 0), 0)
+        old = self._scores.get(user_id)
+        if old == xp:
+            return
+        if old is not None:
+            self._remove(user_id, old)
+        if xp + 1 >= len(self._tree):
+            self._rebuild_tree(max(2 * (len(self._tree) - 1), xp + 1))
+        self._scores[user_id] = xp
+        bucket = self._buckets.get(xp)
+        if bucket is None:
+            bucket = self._buckets[xp] = []
+            insort(self._values, xp)
+        insort(bucket, user_id)
+        self._add(xp, 1)
+
+    def add(self, user_id, points):
+        """Add points to a user's score (inserting them at 0 if needed)"""
+        self.set(user_id, self._scores.get(user_id, 0) + points)
+
+    def discard(self, user_id):
+        old = self._scores.get(user_id)
+        if old is not None:
+            self._remove(user_id, old)
+
+    def rank(self, user_id):
+        """1-based rank, tied users share a rank. None if unknown."""
+        xp = self._scores.get(user_id)
+        if xp is None:
+            return None
+        return 1 + len(self._scores) - self._prefix(xp)
+
+    def top(self, k):
+        """Return up to k (rank, user_id, xp) tuples, best first"""
+        results = []
+        above = 0
+        for position in range(len(self._values) - 1, -1, -1):
+            if len(results) >= k:
+                break
+            xp = self._values[position]
+            bucket = self._buckets[xp]
+            # Ties are broken by user id so the order is stable
+            for user_id in bucket[:k - len(results)]:
+                results.append((above + 1, user_id, xp))
+            above += len(bucket)
+        return results
+
+    def _remove(self, user_id, xp):
+        del self._scores[user_id]
+        bucket = self._buckets[xp]
+        del bucket[bisect_left(bucket, user_id)]
+        if not bucket:
+            del self._buckets[xp]
+            del self._values[bisect_left(self._values, xp)]
+        self._add(xp, -1)
+
+    def _rebuild_tree(self, capacity):
+        tree = [0] * (capacity + 1)
+        for xp, bucket in self._buckets.items():
+            tree[xp + 1] += len(bucket)
+        # Linear-time Fenwick construction
+        for i in range(1, capacity + 1):
+            parent = i + (i & -i)
+            if parent <= capacity:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _add(self, xp, delta):
+        i = xp + 1
+        size = len(self._tree)
+        while i < size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, xp):
+        """Number of users with a score <= xp"""
+        i = min(xp + 1, len(self._tree) - 1)
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+class Leaderboards:
+    """Global, per-age-band and weekly boards, loaded lazily from the DB.
+
+    The boards live in this process's memory and are kept current by the
+    xp_awarded signal, which only fires in the process that made the award.
+    That assumes a single app process; with several workers each one also
+    rebuilds from the database every LEADERBOARD_REBUILD_SECONDS, so boards
+    in other processes lag by at most that long.
+    """
+
+    def __init__(self, rebuild_seconds=3600):
+        self.rebuild_seconds = rebuild_seconds
+        self._app = None
+        self._thread = None
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._replay = None  # awards seen while a rebuild is reading the DB
+        self.global_board = RankIndex()
+        self.bands = {}
+        self.weekly = RankIndex()
+        self.week_start = week_start()
+        self._user_bands = {}
+
+    def init_app(self, app):
+        self._app = app
+        self.rebuild_seconds = app.config.setdefault('LEADERBOARD_REBUILD_SECONDS', self.rebuild_seconds)
+
+    def rebuild(self):
+        """Rebuild every board from the database (needs an app context)"""
+        with self._lock:
+            self._replay = []
+        global_board = RankIndex()
+        bands = {}
+        user_bands = {}
+        band_pairs = {}
+        pairs = []
+
+        rows = db.session.query(User.id, User.total_xp, User.age).yield_per(10000)
+        for user_id, total_xp, age in rows:
+            band = age_band(age)
+            user_bands[user_id] = band
+            pairs.append((user_id, total_xp))
+            band_pairs.setdefault(band, []).append((user_id, total_xp))
+        global_board.load(pairs)
+        for band, members in band_pairs.items():
+            bands[band] = RankIndex()
+            bands[band].load(members)
+
+        # Weekly XP comes from the same awards record_xp applies incrementally
+        start = week_start()
+        weekly = RankIndex()
+        weekly.load(
+            db.session.query(XpAward.user_id, db.func.sum(XpAward.points))
+            .filter(XpAward.created_at >= start)
+            .group_by(XpAward.user_id)
+            .all()
+        )
+
+        with self._lock:
+            self.global_board = global_board
+            self.bands = bands
+            self.weekly = weekly
+            self.week_start = start
+            self._user_bands = user_bands
+            self._loaded = True
+            # Totals are absolute, so re-applying an award the snapshot already
+            # has is harmless; weekly points catch up on the next rebuild
+            replay, self._replay = self._replay, None
+            for user_id, age, total_xp in replay:
+                self._track(user_id, age, total_xp)
+                self._raise(user_id, total_xp)
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.rebuild()
+                    self._start_rebuilder()
+        self._roll_week()
+
+    def record_xp(self, user_id, age, points, total_xp):
+        """Apply a committed XP award incrementally"""
+        if not self._loaded:
+            return  # The next rebuild picks it up from the DB
+        with self._lock:
+            self._roll_week()
+            self._track(user_id, age, total_xp)
+            self._raise(user_id, total_xp)
+            self.weekly.add(user_id, points)
+            if self._replay is not None:
+                self._replay.append((user_id, age, total_xp))
+
+    def board(self, scope, band=None):
+        self.ensure_loaded()
+        if scope == 'global':
+            return self.global_board
+        if scope == 'weekly':
+            return self.weekly
+        if band not in BAND_NAMES:
+            raise ValueError(f'Unknown age band: {band}')
+        # A band nobody is in yet gets an empty board, without storing it
+        return self.bands.get(band) or RankIndex()
+
+    def standings(self, scope, user, limit=10, band=None):
+        """Top entries of a board plus the given user's own position"""
+        with self._lock:
+            board = self.board(scope, band)
+            if scope != 'weekly' and user is not None:
+                self._track(user.id, user.age, user.total_xp or 0)
+            entries = board.top(limit)
+            me = None
+            if user is not None:
+                me = {
+                    'rank': board.rank(user.id),
+                    'xp': board.score(user.id) or 0
+                }
+        return entries, me
+
+    def _track(self, user_id, age, total_xp):
+        """Make sure a user is on the global and band boards"""
+        band = age_band(age)
+        old_band = self._user_bands.get(user_id)
+        if old_band != band:
+            if old_band is not None:
+                self.bands[old_band].discard(user_id)
+            self._user_bands[user_id] = band
+        self.bands.setdefault(band, RankIndex())
+        if user_id not in self.global_board:
+            self.global_board.set(user_id, total_xp)
+        if user_id not in self.bands[band]:
+            self.bands[band].set(user_id, total_xp)
+
+    def _raise(self, user_id, total_xp):
+        # XP only grows, so an award reported out of order can't lower the score
+        total_xp = max(total_xp, self.global_board.score(user_id) or 0)
+        self.global_board.set(user_id, total_xp)
+        self.bands[self._user_bands[user_id]].set(user_id, total_xp)
+
+    def _start_rebuilder(self):
+        if self._thread is not None or self._app is None or not self.rebuild_seconds:
+            return
+        self._thread = threading.Thread(target=self._run, name='leaderboard-rebuild', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.rebuild_seconds)
+            try:
+                with self._app.app_context():
+                    self.rebuild()
+            except Exception as e:
+                print(f"Error rebuilding leaderboards: {str(e)}")
+
+    def _roll_week(self):
+        start = week_start()
+        if start != self.week_start:
+            with self._lock:
+                if start != self.week_start:
+                    self.weekly = RankIndex()
+                    self.week_start = start
+
+boards = Leaderboards()
+
+@xp_awarded.connect
+def _on_xp_awarded(user_id, points=0, total_xp=0, age=None, **extra):
+    try:
+        boards.record_xp(user_id, age, points, total_xp)
+    except Exception as e:
+        print(f"Error updating leaderboards: {str(e)}")
+
+def _leaderboard_response(scope, band=None):
+    try:
+        limit = min(max(request.args.get('limit', 10, type=int), 1), MAX_LIMIT)
+        entries, me = boards.standings(scope, current_user, limit=limit, band=band)
+
+        # Fetch display names for the visible entries in one query
+        ids = [user_id for _, user_id, _ in entries]
+        users = {u.id: u for u in User.query.filter(User.id.in_(ids)).all()} if ids else {}
+
+        return jsonify({
+            'scope': scope,
+            'band': band,
+            'entries': [
+                {
+                    'rank': rank,
+                    'user_id': user_id,
+                    'username': users[user_id].username if user_id in users else None,
+                    'level': users[user_id].level if user_id in users else None,
+                    'xp': xp
+                }
+                for rank, user_id, xp in entries
+            ],
+            'me': me
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@leaderboard.route('/global')
+@login_required
+def global_leaderboard():
+    return _leaderboard_response('global')
+
+@leaderboard.route('/age')
+@login_required
+def age_leaderboard():
+    band = request.args.get('band') or age_band(current_user.age)
+    if band not in BAND_NAMES:
+        return jsonify({'error': f"Unknown age band, expected one of: {', '.join(BAND_NAMES)}"}), 400
+    return _leaderboard_response('age', band=band)
+
+@leaderboard.route('/weekly')
+@login_required
+def weekly_leaderboard():
+    return _leaderboard_response('weekly')
+
+@leaderboard.cli.command('rebuild')
+def rebuild_command():
+    """Rebuild the in-memory leaderboards from the database."""
+    boards.rebuild()
+    print(f"Leaderboards rebuilt for {len(boards.global_board)} users.")
@@ -1,10 +1,24 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from flask.signals import Namespace
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash  # Add this import
 
 db = SQLAlchemy()
 
+# Signals other modules can subscribe to (e.g. the leaderboards)
+model_signals = Namespace()
+# Sent once the awarding transaction commits, with the user's id as sender and
+# plain values as keywords (the instance itself is expired by then)
+xp_awarded = model_signals.signal('xp-awarded')
+
+# A new level every XP_PER_LEVEL XP, up to MAX_LEVEL; add_xp applies this in SQL
+XP_PER_LEVEL = 100
+MAX_LEVEL = 10000
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
     
@@ -45,15 +59,29 @@ class User(UserMixin, db.Model):
         return check_password_hash(self._password, password)
 
     def add_xp(self, points):
-        """Add XP points and handle level ups"""
-        self.total_xp += points
+        """Add XP points and handle level ups (the caller commits)
+
+        The increment happens in SQL, so concurrent awards for the same user
+        can't overwrite each other the way a read-modify-write in Python can.
+        """
+        params = {'user_id': self.id, 'points': points}
+        # One statement raises the total and, when a threshold is crossed, the
+        # level; the level never goes down under a concurrent, bigger award
+        if db.session.get_bind().dialect.update_returning:
+            total_xp, level = db.session.execute(_ADD_XP_RETURNING, params).one()
+        else:
+            db.session.execute(_ADD_XP, params)
+            total_xp, level = db.session.execute(_SELECT_XP, params).one()
         
-        # Check for level up
-        new_level = 1 + (self.total_xp // 100)  # Simple formula: level = 1 + (XP / 100)
-        if new_level > self.level:
-            self.level = new_level
-            
-        db.session.commit()
+        # The ledger is what weekly XP is counted from
+        db.session.execute(_RECORD_AWARD, {'user_id': self.id, 'points': points, 'created_at': datetime.utcnow()})
+        
+        # Refresh the loaded values without marking them as changed
+        set_committed_value(self, 'total_xp', total_xp)
+        set_committed_value(self, 'level', level)
+        db.session.info.setdefault('xp_awards', []).append(
+            {'user_id': self.id, 'points': points, 'total_xp': total_xp, 'age': self.age}
+        )
         return points
 
     def to_dict(self):
@@ -70,6 +98,43 @@ class User(UserMixin, db.Model):
             'total_xp': self.total_xp
         }
 
+# Statements behind User.add_xp, built once
+_users = User.__table__
+_new_total = _users.c.total_xp + db.bindparam('points')
+_new_level = db.case((_new_total // XP_PER_LEVEL + 1 > MAX_LEVEL, MAX_LEVEL), else_=_new_total // XP_PER_LEVEL + 1)
+_ADD_XP = _users.update().where(_users.c.id == db.bindparam('user_id')).values(
+    total_xp=_new_total,
+    level=db.case((_new_level > _users.c.level, _new_level), else_=_users.c.level)
+)
+_ADD_XP_RETURNING = _ADD_XP.returning(_users.c.total_xp, _users.c.level)
+_SELECT_XP = db.select(_users.c.total_xp, _users.c.level).where(_users.c.id == db.bindparam('user_id'))
+
+class XpAward(db.Model):
+    """One XP award, written by User.add_xp (the weekly leaderboard sums these)"""
+    __tablename__ = 'xp_awards'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    points = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    # "This week's XP per user" is a range scan that never touches the table
+    __table_args__ = (db.Index('ix_xp_awards_created_user', 'created_at', 'user_id', 'points'),)
+
+_RECORD_AWARD = XpAward.__table__.insert()
+
+@event.listens_for(Session, 'after_commit')
+def _send_xp_awards(session):
+    for award in session.info.pop('xp_awards', ()):
+        user_id = award.pop('user_id')
+        xp_awarded.send(user_id, **award)
+
+@event.listens_for(Session, 'after_transaction_end')
+def _drop_xp_awards(session, transaction):
+    # Awards from a rolled back (or abandoned) transaction are never announced
+    if transaction.parent is None:
+        session.info.pop('xp_awards', None)
+
 class QuizAttempt(db.Model):
     __tablename__ = 'quiz_attempts'
     
@@ -162,3 +227,95 @@ class Activity(db.Model):
     activity_metadata = db.Column(db.JSON, nullable=True)  # For additional data
     
     user = db.relationship('User', back_populates='activities')
+    
+    # Keyset pagination of a user's history walks this index
+    __table_args__ = (db.Index('ix_activities_user_created_id', 'user_id', 'created_at', 'id'),)
+
+class ActivityArchive(db.Model):
+    """A month of a user's activities packed into one compressed blob"""
+    __tablename__ = 'activity_archives'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    activity_type = db.Column(db.String(50), nullable=False)
+    month = db.Column(db.String(7), nullable=False)  # e.g. '2024-03'
+    item_count = db.Column(db.Integer, default=0)
+    data = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed JSON lines
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.UniqueConstraint('user_id', 'activity_type', 'month'),)
+    
+    def to_dict(self):
+        return {
+            'month': self.month,
+            'activity_type': self.activity_type,
+            'item_count': self.item_count,
+            'archived_at': self.created_at.isoformat()
+        }
+
+class ReviewItem(db.Model):
+    """Spaced-repetition memory state for one quiz question and one user"""
+    __tablename__ = 'review_items'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    question_key = db.Column(db.String(40), nullable=False)  # Hash of topic + question text
+    topic = db.Column(db.String(100), nullable=False)
+    question = db.Column(db.JSON, nullable=False)  # The question as served in the quiz
+    easiness = db.Column(db.Float, default=2.5)
+    interval_days = db.Column(db.Integer, default=0)
+    repetitions = db.Column(db.Integer, default=0)
+    lapses = db.Column(db.Integer, default=0)
+    due_at = db.Column(db.DateTime, nullable=True)  # None until first answered
+    last_reviewed_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'question_key'),
+        # "What's due now" is a range scan on this index
+        db.Index('ix_review_items_user_due', 'user_id', 'due_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'topic': self.topic,
+            'question': self.question.get('question') if self.question else None,
+            'easiness': self.easiness,
+            'interval_days': self.interval_days,
+            'repetitions': self.repetitions,
+            'due_at': self.due_at.isoformat() if self.due_at else None
+        }
+
+class RequestProfile(db.Model):
+    """A profile captured for one request, for finding where slow requests spend their time"""
+    __tablename__ = 'request_profiles'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    endpoint = db.Column(db.String(100))
+    method = db.Column(db.String(10), nullable=False)
+    path = db.Column(db.String(255), nullable=False)
+    status_code = db.Column(db.Integer)
+    duration_ms = db.Column(db.Float, nullable=False)
+    trigger = db.Column(db.String(20), nullable=False)  # 'header' or 'sampled'
+    profiler = db.Column(db.String(20), nullable=False)  # 'sampling' or 'cprofile'
+    sample_count = db.Column(db.Integer, default=0)
+    stacks = db.Column(db.LargeBinary, nullable=True)  # zlib-compressed collapsed stacks
+    stats = db.Column(db.LargeBinary, nullable=True)  # zlib-compressed marshalled pstats
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'endpoint': self.endpoint,
+            'method': self.method,
+            'path': self.path,
+            'status_code': self.status_code,
+            'duration_ms': round(self.duration_ms, 1),
+            'trigger': self.trigger,
+            'profiler': self.profiler,
+            'sample_count': self.sample_count,
+            'created_at': self.created_at.isoformat()
+        }
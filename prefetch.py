@@ -0,0 +1,198 @@
+from flask import Blueprint, jsonify
+from auth import admin_required
+from admission import llm_admission, TokenBucket
+from safety import content_filter, ContentBlocked
+from collections import OrderedDict
+import re
+import threading
+import time
+
+prefetch = Blueprint('prefetch', __name__)
+
+# The follow-up we predict, and the messages that count as asking for it
+FOLLOW_UP_PROMPT = 'Tell me more!'
+FOLLOW_UP_PHRASES = {
+    'tell me more', 'tell me more please', 'more', 'more please', 'go on', 'keep going',
+    'what else', 'and then', 'what else can you tell me', 'can you tell me more'
+}
+
+FOLLOW_UP = 'follow_up'
+QUIZ = 'quiz'
+
+def normalize_message(message):
+    return ' '.join(re.sub(r"[^\w\s']", ' ', (message or '').lower()).split())
+
+def is_follow_up(message):
+    return normalize_message(message) in FOLLOW_UP_PHRASES
+
+class _Slot:
+    __slots__ = ('value', 'turn', 'expires')
+
+    def __init__(self, value, turn, expires):
+        self.value = value
+        self.turn = turn
+        self.expires = expires
+
+class Prefetcher:
+    """Speculative prefetch of each user's likely next LLM call.
+
+    After Buddy answers, a background worker pre-generates the reply to
+    "tell me more" and the next quiz on the active topic, and keeps them in
+    short-lived per-user slots. Work only runs while the admission controller
+    has spare capacity and the prefetch budget allows it, and a prefetched
+    reply is only used if the chat memory hasn't moved on since it was made.
+    """
+
+    def __init__(self, enabled=False, ttl=120, budget_per_minute=10, reserve=1, max_pending=32, max_users=1000):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.budget_per_minute = budget_per_minute
+        self.reserve = reserve
+        self.max_pending = max_pending
+        self.max_users = max_users
+        self.chatbot = None
+        self.interactive = None
+
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()   # (user_id, kind) -> topic, latest request wins
+        self._slots = OrderedDict()     # user_id -> {kind: _Slot}, least recently used first
+        self._budget = TokenBucket(budget_per_minute / 60.0, max(1, budget_per_minute))
+        self._counts = {}
+        self._thread = None
+
+    def init_app(self, app, chatbot, interactive):
+        self.enabled = app.config.setdefault('PREFETCH_ENABLED', self.enabled)
+        self.ttl = app.config.setdefault('PREFETCH_TTL_SECONDS', self.ttl)
+        self.budget_per_minute = app.config.setdefault('PREFETCH_BUDGET_PER_MINUTE', self.budget_per_minute)
+        self.reserve = app.config.setdefault('PREFETCH_RESERVE_SLOTS', self.reserve)
+        self._budget = TokenBucket(self.budget_per_minute / 60.0, max(1, self.budget_per_minute))
+        self.chatbot = chatbot
+        self.interactive = interactive
+
+    def schedule(self, user_id, topic=None):
+        """Queue prefetches after a reply: the follow-up, and a quiz if there's a topic"""
+        if not self.enabled:
+            return
+        self._enqueue(user_id, FOLLOW_UP, None)
+        if topic:
+            self._enqueue(user_id, QUIZ, topic)
+
+    def take_follow_up(self, user_id, message):
+        """The prefetched reply if the message asks for it and it's still valid, else None"""
+        if not self.enabled or not is_follow_up(message):
+            return None
+        slot = self._take(user_id, FOLLOW_UP)
+        if slot is not None and self.chatbot.remember(message, slot.value, turn=slot.turn):
+            self._count('follow_up_hits')
+            return slot.value
+        self._count('follow_up_stale' if slot is not None else 'follow_up_misses')
+        return None
+
+    def take_quiz(self, user_id):
+        """The prefetched quiz for the user, if one is ready; queues the next one on a hit"""
+        if not self.enabled:
+            return None
+        slot = self._take(user_id, QUIZ)
+        if slot is None:
+            self._count('quiz_misses')
+            return None
+        self._count('quiz_hits')
+        self._enqueue(user_id, QUIZ, slot.value.get('topic'))
+        return slot.value
+
+    def stats(self):
+        with self._cond:
+            counts = dict(self._counts)
+            pending = len(self._pending)
+            users = len(self._slots)
+        stats = {'enabled': self.enabled, 'pending': pending, 'users_with_slots': users, **counts}
+        for kind in (FOLLOW_UP, QUIZ):
+            hits = counts.get(f'{kind}_hits', 0)
+            total = hits + counts.get(f'{kind}_misses', 0) + counts.get(f'{kind}_stale', 0)
+            stats[f'{kind}_hit_rate'] = round(hits / total, 3) if total else None
+        return stats
+
+    def run_once(self, user_id, kind, topic):
+        """Generate one prefetch if there's spare capacity and budget; returns True if stored"""
+        with self._cond:
+            if self._budget.wait_time() > 0:
+                self._counts['skipped_budget'] = self._counts.get('skipped_budget', 0) + 1
+                return False
+        if not llm_admission.try_acquire_spare(self.reserve):
+            self._count('skipped_busy')
+            return False
+
+        start = time.monotonic()
+        try:
+            with self._cond:
+                self._budget.take()
+            if kind == FOLLOW_UP:
+                value, turn = self.chatbot.predict(FOLLOW_UP_PROMPT, scanner=content_filter.scanner())
+            else:
+                value, turn = self.interactive.generate_quiz(topic=topic), None
+            if not value:
+                self._count('failed')
+                return False
+            self._store(user_id, kind, value, turn)
+            self._count(f'{kind}_generated')
+            return True
+        except ContentBlocked:
+            self._count('blocked')
+            return False
+        except Exception as e:
+            print(f"Error prefetching {kind}: {str(e)}")
+            self._count('failed')
+            return False
+        finally:
+            llm_admission.release(time.monotonic() - start)
+
+    def _enqueue(self, user_id, kind, topic):
+        with self._cond:
+            key = (user_id, kind)
+            self._pending.pop(key, None)
+            if len(self._pending) >= self.max_pending:
+                self._pending.popitem(last=False)
+                self._counts['dropped'] = self._counts.get('dropped', 0) + 1
+            self._pending[key] = topic
+            self._start_worker()
+            self._cond.notify()
+
+    def _take(self, user_id, kind):
+        with self._cond:
+            slot = self._slots.get(user_id, {}).pop(kind, None)
+            if slot is not None and slot.expires < time.monotonic():
+                self._counts['expired'] = self._counts.get('expired', 0) + 1
+                return None
+            return slot
+
+    def _store(self, user_id, kind, value, turn):
+        with self._cond:
+            slots = self._slots.pop(user_id, {})
+            slots[kind] = _Slot(value, turn, time.monotonic() + self.ttl)
+            self._slots[user_id] = slots
+            while len(self._slots) > self.max_users:
+                self._slots.popitem(last=False)
+
+    def _count(self, name):
+        with self._cond:
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def _start_worker(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='llm-prefetch', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                (user_id, kind), topic = self._pending.popitem(last=False)
+            self.run_once(user_id, kind, topic)
+
+prefetcher = Prefetcher()
+
+@prefetch.route('/stats')
+@admin_required
+def get_stats():
+    return jsonify({'prefetch': prefetcher.stats(), 'admission': llm_admission.stats()})
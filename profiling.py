@@ -0,0 +1,209 @@
+from flask import Blueprint, jsonify, request, render_template, g, Response, abort
+from flask_login import current_user
+from models import db, RequestProfile
+from auth import admin_required, is_admin
+from collections import Counter
+import cProfile
+import marshal
+import random
+import sys
+import threading
+import time
+import zlib
+
+profiling = Blueprint('profiling', __name__)
+
+PROFILE_HEADER = 'X-Profile'
+PAGE_SIZE = 100
+
+# Never profile these endpoints (static files and the profile browser itself)
+SKIPPED_ENDPOINTS = {'static', 'profiling.list_profiles', 'profiling.download_profile'}
+
+def _frame_name(code):
+    # Last two path parts are enough to tell e.g. app.py from routing.py or sqlalchemy/engine/base.py
+    filename = '/'.join(code.co_filename.replace('\\', '/').split('/')[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+def collapse(frame):
+    """A frame's stack in collapsed format: root first, frames separated by ';'"""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class StackSampler:
+    """Samples one thread's stack every `interval` seconds from a helper thread.
+
+    Wall-clock sampling, so time spent waiting on the LLM or the database shows
+    up as well as CPU time; the profiled thread itself does no extra work.
+    """
+
+    def __init__(self, thread_id, interval=0.005, max_seconds=120):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_samples = int(max_seconds / interval)
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.counts.most_common())
+
+    def _run(self):
+        taken = 0
+        while not self._stop.wait(self.interval) and taken < self.max_samples:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.counts[collapse(frame)] += 1
+                taken += 1
+            del frame
+
+class _Capture:
+    __slots__ = ('trigger', 'profiler', 'sampler', 'cprofile', 'started')
+
+class RequestProfiler:
+    """Opt-in per-request profiling.
+
+    A request is profiled when an admin sends the X-Profile header ('1' or
+    'sampling' for the stack sampler, 'cprofile' for cProfile) or when it is
+    picked by 1-in-N random sampling (PROFILE_SAMPLE_RATE, 0 = off). Other
+    requests only pay for a header lookup.
+    """
+
+    def __init__(self, sample_rate=0, mode='sampling', interval=0.005, max_seconds=120):
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.interval = interval
+        self.max_seconds = max_seconds
+
+    def init_app(self, app):
+        self.sample_rate = app.config.setdefault('PROFILE_SAMPLE_RATE', self.sample_rate)
+        self.mode = app.config.setdefault('PROFILE_MODE', self.mode)
+        self.interval = app.config.setdefault('PROFILE_INTERVAL', self.interval)
+        self.max_seconds = app.config.setdefault('PROFILE_MAX_SECONDS', self.max_seconds)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        header = request.headers.get(PROFILE_HEADER)
+        if header is not None:
+            if request.endpoint in SKIPPED_ENDPOINTS or not is_admin(current_user):
+                return
+            trigger = 'header'
+            mode = 'cprofile' if header.strip().lower() == 'cprofile' else 'sampling'
+        elif self.sample_rate and random.random() * self.sample_rate < 1:
+            if request.endpoint in SKIPPED_ENDPOINTS:
+                return
+            trigger = 'sampled'
+            mode = self.mode
+        else:
+            return
+
+        capture = _Capture()
+        capture.trigger = trigger
+        capture.profiler = mode
+        capture.sampler = None
+        capture.cprofile = None
+        if mode == 'cprofile':
+            try:
+                capture.cprofile = cProfile.Profile()
+                capture.cprofile.enable()
+            except ValueError:
+                # Python 3.12+ allows one cProfile at a time; sample this one instead
+                capture.cprofile = None
+                capture.profiler = mode = 'sampling'
+        if mode != 'cprofile':
+            capture.sampler = StackSampler(threading.get_ident(), self.interval, self.max_seconds)
+            capture.sampler.start()
+        capture.started = time.perf_counter()
+        g._profile_capture = capture
+
+    def _after_request(self, response):
+        if '_profile_capture' in g:
+            g._profile_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        capture = g.pop('_profile_capture', None)
+        if capture is None:
+            return
+        duration_ms = (time.perf_counter() - capture.started) * 1000
+        try:
+            if capture.cprofile is not None:
+                capture.cprofile.disable()
+                capture.cprofile.create_stats()
+                stacks, stats, samples = None, zlib.compress(marshal.dumps(capture.cprofile.stats)), 0
+            else:
+                capture.sampler.stop()
+                stacks = zlib.compress(capture.sampler.collapsed().encode('utf-8'))
+                stats, samples = None, sum(capture.sampler.counts.values())
+
+            user_id = current_user.id if current_user.is_authenticated else None
+            # Own connection, so a failed request's session state can't affect the write
+            with db.engine.begin() as connection:
+                connection.execute(RequestProfile.__table__.insert().values(
+                    user_id=user_id,
+                    endpoint=request.endpoint,
+                    method=request.method,
+                    path=request.path[:255],
+                    status_code=g.pop('_profile_status', 500),
+                    duration_ms=duration_ms,
+                    trigger=capture.trigger,
+                    profiler=capture.profiler,
+                    sample_count=samples,
+                    stacks=stacks,
+                    stats=stats
+                ))
+        except Exception as e:
+            print(f"Error saving request profile: {str(e)}")
+
+request_profiler = RequestProfiler()
+
+@profiling.route('')
+@admin_required
+def list_profiles():
+    query = RequestProfile.query.order_by(RequestProfile.created_at.desc(), RequestProfile.id.desc())
+    endpoint = request.args.get('view')
+    if endpoint:
+        query = query.filter(RequestProfile.endpoint == endpoint)
+    slowest = request.args.get('sort') == 'slowest'
+    if slowest:
+        query = query.order_by(None).order_by(RequestProfile.duration_ms.desc())
+    # Leave the blobs in the DB; the list only needs the summary columns
+    profiles = query.options(db.defer(RequestProfile.stacks), db.defer(RequestProfile.stats)).limit(PAGE_SIZE).all()
+
+    if request.args.get('format') == 'json':
+        return jsonify({'profiles': [profile.to_dict() for profile in profiles]})
+    return render_template('profiles.html', profiles=profiles, endpoint=endpoint, slowest=slowest)
+
+@profiling.route('/<int:profile_id>.<fmt>')
+@admin_required
+def download_profile(profile_id, fmt):
+    profile = db.session.get(RequestProfile, profile_id)
+    if profile is None:
+        abort(404)
+
+    if fmt == 'collapsed' and profile.stacks is not None:
+        # Feed to flamegraph.pl, speedscope or inferno to get a flame graph
+        return Response(
+            zlib.decompress(profile.stacks),
+            mimetype='text/plain',
+            headers={'Content-Disposition': f'attachment; filename=profile-{profile.id}.collapsed'}
+        )
+    if fmt == 'pstats' and profile.stats is not None:
+        # Loadable with pstats.Stats(path) or snakeviz
+        return Response(
+            zlib.decompress(profile.stats),
+            mimetype='application/octet-stream',
+            headers={'Content-Disposition': f'attachment; filename=profile-{profile.id}.pstats'}
+        )
+    return jsonify({'error': f'No {fmt} data for this profile'}), 404
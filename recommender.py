@@ -0,0 +1,242 @@
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from models import db, LearningSession, QuizAttempt
+import threading
+import time
+
+recommend = Blueprint('recommend', __name__)
+
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 20
+
+# Placeholder topics the app records that say nothing about interests
+IGNORED_TOPICS = {'general chat', 'general knowledge', 'general conversation', 'quiz', 'review time'}
+
+def normalize_topic(topic):
+    topic = ' '.join((topic or '').lower().split())[:100]
+    return None if not topic or topic in IGNORED_TOPICS else topic
+
+class TopicRecommender:
+    """Related-topic suggestions from a sparse topic co-occurrence matrix.
+
+    Two topics co-occur when the same user has learned both. Counts live in a
+    SciPy CSR matrix; new observations are queued as (row, col) increments and
+    merged by a background thread, which also recomputes each topic's top
+    neighbors by cosine similarity. Queries only read those precomputed lists.
+    """
+
+    def __init__(self, neighbors=20, refresh_seconds=30):
+        self.neighbor_count = neighbors
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._topic_ids = {}      # topic -> matrix index
+        self._topics = []         # matrix index -> topic
+        self._user_topics = {}    # user_id -> {topic index: None}, in the order learned
+        self._counts = None
+        self._pending_rows = []
+        self._pending_cols = []
+        self._neighbors = {}      # topic index -> [(topic index, score)]
+        self._thread = None
+
+    def init_app(self, app):
+        self.neighbor_count = app.config.setdefault('RECOMMENDER_NEIGHBORS', self.neighbor_count)
+        self.refresh_seconds = app.config.setdefault('RECOMMENDER_REFRESH_SECONDS', self.refresh_seconds)
+
+    def rebuild(self):
+        """Build the matrix from every (user, topic) pair in the DB (needs an app context)"""
+        import numpy as np
+        from scipy import sparse
+
+        pairs = db.session.query(LearningSession.user_id, LearningSession.topic).distinct()\
+            .union(db.session.query(QuizAttempt.user_id, QuizAttempt.topic).distinct())
+
+        topic_ids, topics, user_topics = {}, [], {}
+        users, columns = [], []
+        user_rows = {}
+        for user_id, raw_topic in pairs.yield_per(10000):
+            topic = normalize_topic(raw_topic)
+            if topic is None:
+                continue
+            index = topic_ids.get(topic)
+            if index is None:
+                index = topic_ids[topic] = len(topics)
+                topics.append(topic)
+            learned = user_topics.setdefault(user_id, {})
+            if index in learned:
+                continue
+            learned[index] = None
+            users.append(user_rows.setdefault(user_id, len(user_rows)))
+            columns.append(index)
+
+        # Users x topics incidence; its Gram matrix is the co-occurrence count
+        incidence = sparse.csr_matrix(
+            (np.ones(len(users), dtype=np.float32), (users, columns)),
+            shape=(len(user_rows), len(topics))
+        )
+        counts = (incidence.T @ incidence).tocsr()
+
+        with self._lock:
+            self._topic_ids = topic_ids
+            self._topics = topics
+            self._user_topics = user_topics
+            self._counts = counts
+            self._pending_rows, self._pending_cols = [], []
+            self._neighbors = self._compute_neighbors(counts)
+            self._loaded = True
+        self._start_refresher()
+
+    def ensure_loaded(self):
+        # Concurrent first requests wait for one rebuild instead of each running one
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self.rebuild()
+
+    def observe(self, user_id, raw_topic):
+        """Record that a user learned a topic; merged on the next refresh"""
+        topic = normalize_topic(raw_topic)
+        if topic is None or not self._loaded:
+            return  # Not loaded yet: the first rebuild reads it from the DB
+        with self._lock:
+            index = self._topic_ids.get(topic)
+            if index is None:
+                index = self._topic_ids[topic] = len(self._topics)
+                self._topics.append(topic)
+            learned = self._user_topics.setdefault(user_id, {})
+            if index in learned:
+                return
+            others = list(learned)
+            # Symmetric increments against every topic the user already knows
+            self._pending_rows.extend(others + [index] * len(others) + [index])
+            self._pending_cols.extend([index] * len(others) + others + [index])
+            learned[index] = None
+
+    def related(self, raw_topic, limit=DEFAULT_LIMIT):
+        self.ensure_loaded()
+        index = self._topic_ids.get(normalize_topic(raw_topic))
+        if index is None:
+            return []
+        return [
+            {'topic': self._topics[other], 'score': round(score, 4)}
+            for other, score in self._neighbors.get(index, [])[:limit]
+        ]
+
+    def recommend_for(self, user_id, limit=DEFAULT_LIMIT, recent=10):
+        """Topics related to what the user learned recently, that they haven't learned yet"""
+        self.ensure_loaded()
+        learned = self._user_topics.get(user_id, {})
+        scores = {}
+        for index in list(learned)[-recent:]:
+            for other, score in self._neighbors.get(index, []):
+                if other not in learned:
+                    scores[other] = scores.get(other, 0.0) + score
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [{'topic': self._topics[index], 'score': round(score, 4)} for index, score in best]
+
+    def refresh(self):
+        """Merge pending increments and recompute neighbor lists"""
+        import numpy as np
+        from scipy import sparse
+
+        with self._lock:
+            if not self._pending_rows:
+                return
+            rows, cols = self._pending_rows, self._pending_cols
+            self._pending_rows, self._pending_cols = [], []
+            size = len(self._topics)
+            counts = self._counts
+
+        counts = counts.copy()
+        counts.resize((size, size))
+        counts = counts + sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(size, size)
+        )
+        neighbors = self._compute_neighbors(counts)
+
+        with self._lock:
+            self._counts = counts
+            self._neighbors = neighbors
+
+    def _compute_neighbors(self, counts):
+        import numpy as np
+        from scipy import sparse
+
+        # Cosine similarity between topics' user sets: C_ij / sqrt(C_ii * C_jj)
+        popularity = counts.diagonal().astype(np.float64)
+        popularity[popularity == 0] = 1
+        scale = sparse.diags(1 / np.sqrt(popularity))
+        similarity = (scale @ counts @ scale).tocsr()
+        similarity.setdiag(0)
+        similarity.eliminate_zeros()
+
+        neighbors = {}
+        indptr, indices, data = similarity.indptr, similarity.indices, similarity.data
+        for row in range(similarity.shape[0]):
+            start, end = indptr[row], indptr[row + 1]
+            if start == end:
+                continue
+            row_data = data[start:end]
+            k = min(self.neighbor_count, end - start)
+            best = np.argpartition(-row_data, k - 1)[:k]
+            best = best[np.argsort(-row_data[best])]
+            neighbors[row] = list(zip(indices[start:end][best].tolist(), row_data[best].tolist()))
+        return neighbors
+
+    def _start_refresher(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='topic-recommender', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh_seconds)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing topic recommendations: {str(e)}")
+
+recommender = TopicRecommender()
+
+# Inserts are only observed once their transaction commits, so a rolled back
+# session or quiz never shows up in the co-occurrence counts
+
+@event.listens_for(LearningSession, 'after_insert')
+@event.listens_for(QuizAttempt, 'after_insert')
+def _queue_learned_topic(mapper, connection, row):
+    object_session(row).info.setdefault('learned_topics', []).append((row.user_id, row.topic))
+
+@event.listens_for(Session, 'after_commit')
+def _observe_learned_topics(session):
+    for user_id, topic in session.info.pop('learned_topics', ()):
+        recommender.observe(user_id, topic)
+
+@event.listens_for(Session, 'after_transaction_end')
+def _drop_learned_topics(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('learned_topics', None)
+
+@recommend.route('')
+@login_required
+def get_recommendations():
+    try:
+        limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+        return jsonify({'topics': recommender.recommend_for(current_user.id, limit=limit)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@recommend.route('/related')
+@login_required
+def get_related():
+    topic = request.args.get('topic', '')
+    if not topic.strip():
+        return jsonify({'error': 'No topic provided'}), 400
+    try:
+        limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+        return jsonify({'topic': topic, 'related': recommender.related(topic, limit=limit)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
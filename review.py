@@ -0,0 +1,118 @@
+from flask import Blueprint, jsonify
+from flask_login import login_required, current_user
+from models import db, ReviewItem
+from datetime import datetime, timedelta
+import hashlib
+
+review = Blueprint('review', __name__)
+
+REVIEW_QUIZ_SIZE = 3
+REVIEW_TOPIC = 'Review Time'
+
+# SM-2 answer quality (0-5) for right and wrong answers
+QUALITY_CORRECT = 4
+QUALITY_INCORRECT = 1
+
+def question_key(topic, question):
+    """Stable identity of a quiz question, used to find it again later"""
+    text = f"{topic.strip().lower()}\n{question.get('question', '').strip().lower()}"
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def sm2(easiness, interval_days, repetitions, quality):
+    """One step of the SM-2 algorithm; returns (easiness, interval_days, repetitions)"""
+    if quality < 3:
+        # Forgotten: start the item over
+        repetitions = 0
+        interval_days = 1
+    else:
+        if repetitions == 0:
+            interval_days = 1
+        elif repetitions == 1:
+            interval_days = 6
+        else:
+            interval_days = round(interval_days * easiness)
+        repetitions += 1
+
+    easiness = easiness + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return max(easiness, 1.3), interval_days, repetitions
+
+def register_quiz(user_id, quiz):
+    """Tag each question with a review key and store any new ones (the caller commits)"""
+    topic = quiz.get('topic', 'Quiz')
+    keyed = {}
+    for question in quiz.get('questions', []):
+        question['review_key'] = question_key(topic, question)
+        keyed[question['review_key']] = question
+
+    if not keyed:
+        return quiz
+
+    # One set-based lookup for the whole quiz
+    existing = {
+        key for (key,) in db.session.query(ReviewItem.question_key).filter(
+            ReviewItem.user_id == user_id,
+            ReviewItem.question_key.in_(list(keyed))
+        )
+    }
+    for key, question in keyed.items():
+        if key not in existing:
+            db.session.add(ReviewItem(
+                user_id=user_id,
+                question_key=key,
+                topic=topic[:100],
+                question={k: v for k, v in question.items() if k != 'review_key'}
+            ))
+    return quiz
+
+def record_answer(user_id, key, correct, now=None):
+    """Update an item's memory state after the user answered it (the caller commits)"""
+    item = ReviewItem.query.filter_by(user_id=user_id, question_key=key).first()
+    if not item:
+        return None
+
+    now = now or datetime.utcnow()
+    quality = QUALITY_CORRECT if correct else QUALITY_INCORRECT
+    item.easiness, item.interval_days, item.repetitions = sm2(
+        item.easiness, item.interval_days, item.repetitions, quality
+    )
+    if not correct:
+        item.lapses += 1
+    item.last_reviewed_at = now
+    item.due_at = now + timedelta(days=item.interval_days)
+    return item
+
+def due_items(user_id, limit=REVIEW_QUIZ_SIZE, now=None):
+    """Oldest-due items first, straight off the (user_id, due_at) index"""
+    return ReviewItem.query.filter(
+        ReviewItem.user_id == user_id,
+        ReviewItem.due_at <= (now or datetime.utcnow())
+    ).order_by(ReviewItem.due_at).limit(limit).all()
+
+def build_review_quiz(user_id, size=REVIEW_QUIZ_SIZE):
+    """A quiz made of due review items, or None if nothing is due"""
+    items = due_items(user_id, limit=size)
+    if not items:
+        return None
+    questions = []
+    for item in items:
+        question = dict(item.question)
+        question['review_key'] = item.question_key
+        questions.append(question)
+    return {'topic': REVIEW_TOPIC, 'review': True, 'questions': questions}
+
+@review.route('/due')
+@login_required
+def get_due():
+    now = datetime.utcnow()
+    due_count = db.session.query(db.func.count(ReviewItem.id)).filter(
+        ReviewItem.user_id == current_user.id,
+        ReviewItem.due_at <= now
+    ).scalar()
+    next_due = db.session.query(db.func.min(ReviewItem.due_at)).filter(
+        ReviewItem.user_id == current_user.id,
+        ReviewItem.due_at > now
+    ).scalar()
+    return jsonify({
+        'due_count': due_count,
+        'next_due_at': next_due.isoformat() if next_due else None
+    })
@@ -0,0 +1,475 @@
+from flask import Blueprint, Response, jsonify, request
+from flask_login import login_required, current_user
+from models import db, User, QuizAttempt
+from admission import admission_required
+from progress import check_quiz_achievements
+from collections import deque
+import json
+import secrets
+import threading
+import time
+
+rooms = Blueprint('rooms', __name__)
+
+# Room codes avoid look-alike characters (0/O, 1/I) so kids can read them out
+CODE_ALPHABET = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+CODE_LENGTH = 6
+MAX_MEMBERS = 8
+XP_PER_CORRECT = 2
+TEAM_XP_MULTIPLIER = 2  # Team quizzes earn double points
+ROOM_TTL_SECONDS = 30 * 60
+FINISHED_TTL_SECONDS = 5 * 60
+SUBSCRIBER_BUFFER = 256
+HEARTBEAT_SECONDS = 15
+KEEPALIVE = b': keep-alive\n\n'
+
+class RoomError(Exception):
+    """A room request that can't be done; carries the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def encode_event(event_id, event, payload):
+    """One SSE frame, serialized once and shared by every subscriber"""
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+    return f'id: {event_id}\nevent: {event}\ndata: {data}\n\n'.encode('utf-8')
+
+class Subscriber:
+    """One open event stream: a bounded buffer of encoded frames.
+
+    A client that falls SUBSCRIBER_BUFFER frames behind is disconnected
+    instead of letting its backlog grow; it can reconnect and get a fresh
+    snapshot.
+    """
+
+    def __init__(self, user_id, limit=SUBSCRIBER_BUFFER):
+        self.user_id = user_id
+        self.limit = limit
+        self.closed = False
+        self._frames = deque()
+        self._cond = threading.Condition()
+
+    def push(self, frame):
+        with self._cond:
+            if self.closed:
+                return False
+            if len(self._frames) >= self.limit:
+                self.closed = True
+            else:
+                self._frames.append(frame)
+            self._cond.notify()
+            return not self.closed
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+    def next(self, timeout=HEARTBEAT_SECONDS):
+        """The next frame, KEEPALIVE after `timeout` idle seconds, or None once closed"""
+        with self._cond:
+            if not self._frames and not self.closed:
+                self._cond.wait(timeout)
+            if self._frames:
+                return self._frames.popleft()
+            return None if self.closed else KEEPALIVE
+
+    def drain(self):
+        """Every buffered frame, without waiting"""
+        with self._cond:
+            frames = list(self._frames)
+            self._frames.clear()
+            return frames
+
+class Room:
+    """A team quiz: members, the current question and scores, all in memory"""
+
+    def __init__(self, code, host_id, quiz):
+        self.code = code
+        self.host_id = host_id
+        self.topic = quiz.get('topic', 'Team Quiz')
+        self.questions = quiz['questions']
+        self.state = 'waiting'  # waiting -> question -> finished
+        self.question_index = -1
+        self.members = {}       # user_id -> display name, in join order
+        self.scores = {}        # user_id -> correct answers
+        self.answers = {}       # user_id -> selected option for the current question
+        self.revealed = False
+        self.results = None
+        self._saving = False
+        self.updated_at = time.monotonic()
+        self._subscribers = []
+        self._event_id = 0
+        self._lock = threading.Lock()
+
+    def join(self, user_id, name):
+        with self._lock:
+            if user_id in self.members:
+                return self._snapshot()
+            if self.state == 'finished':
+                raise RoomError('This quiz has already finished', 409)
+            if len(self.members) >= MAX_MEMBERS:
+                raise RoomError('This room is full', 409)
+            self.members[user_id] = name
+            self.scores[user_id] = 0
+            self._broadcast('joined', {'user_id': user_id, 'name': name, 'members': self._member_list()})
+            return self._snapshot()
+
+    def leave(self, user_id):
+        with self._lock:
+            if self.members.pop(user_id, None) is None:
+                return
+            self.answers.pop(user_id, None)
+            self._broadcast('left', {'user_id': user_id, 'members': self._member_list()})
+            if self.state == 'question':
+                self._maybe_reveal()
+
+    def subscribe(self, user_id):
+        """Open an event stream for a member; it starts with a snapshot of the room"""
+        subscriber = Subscriber(user_id)
+        with self._lock:
+            if user_id not in self.members:
+                raise RoomError('Join the room first', 403)
+            subscriber.push(encode_event(self._event_id, 'state', self._snapshot()))
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.close()
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def start(self, user_id):
+        with self._lock:
+            self._require_host(user_id)
+            if self.state != 'waiting':
+                raise RoomError('The quiz has already started', 409)
+            self._next_question()
+
+    def answer(self, user_id, question_index, selected):
+        """Record a member's answer; returns whether it was right"""
+        with self._lock:
+            if user_id not in self.members:
+                raise RoomError('Join the room first', 403)
+            if self.state != 'question' or question_index != self.question_index:
+                raise RoomError('That question is not open', 409)
+            if user_id in self.answers:
+                raise RoomError('You already answered this question', 409)
+
+            self.answers[user_id] = selected
+            correct = selected == self.questions[self.question_index].get('correct_index')
+            if correct:
+                self.scores[user_id] += 1
+            self._broadcast('answered', {
+                'user_id': user_id,
+                'question_index': self.question_index,
+                'answered': len(self.answers),
+                'members': len(self.members)
+            })
+            self._maybe_reveal()
+            return correct
+
+    def advance(self, user_id):
+        """Move to the next question; returns True when that finished the quiz"""
+        with self._lock:
+            self._require_host(user_id)
+            if self.state == 'finished' and self.results is None and not self._saving:
+                self._saving = True
+                return True  # Saving the results failed last time; let the host retry
+            if self.state != 'question':
+                raise RoomError('The quiz is not running', 409)
+            if self.question_index + 1 < len(self.questions):
+                self._next_question()
+                return False
+            self.state = 'finished'
+            self._saving = True
+            self.updated_at = time.monotonic()
+            return True
+
+    def save_failed(self):
+        with self._lock:
+            self._saving = False
+
+    def finish(self, results):
+        """Publish the saved results and close every stream"""
+        with self._lock:
+            self.results = results
+            self._saving = False
+            self._broadcast('finished', {'scores': self._score_list(), 'results': results})
+            for subscriber in self._subscribers:
+                subscriber.close()
+            self._subscribers = []
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot()
+
+    def final_scores(self):
+        """(user_id, name, score) for every member"""
+        with self._lock:
+            return [(user_id, name, self.scores.get(user_id, 0)) for user_id, name in self.members.items()]
+
+    def close(self):
+        with self._lock:
+            for subscriber in self._subscribers:
+                subscriber.close()
+            self._subscribers = []
+
+    def _next_question(self):
+        self.question_index += 1
+        self.state = 'question'
+        self.answers = {}
+        self.revealed = False
+        self._broadcast('question', {
+            'question_index': self.question_index,
+            'total_questions': len(self.questions),
+            'question': self._public_question()
+        })
+
+    def _maybe_reveal(self):
+        if not self.revealed and self.members and len(self.answers) >= len(self.members):
+            self.revealed = True
+            question = self.questions[self.question_index]
+            self._broadcast('reveal', {
+                'question_index': self.question_index,
+                'correct_index': question.get('correct_index'),
+                'explanation': question.get('explanation'),
+                'scores': self._score_list()
+            })
+
+    def _broadcast(self, event, payload):
+        """Serialize once, then hand the same bytes to every subscriber (room lock held)"""
+        self._event_id += 1
+        self.updated_at = time.monotonic()
+        frame = encode_event(self._event_id, event, payload)
+        dropped = [subscriber for subscriber in self._subscribers if not subscriber.push(frame)]
+        for subscriber in dropped:
+            self._subscribers.remove(subscriber)
+
+    def _require_host(self, user_id):
+        if user_id != self.host_id:
+            raise RoomError('Only the host can do that', 403)
+
+    def _public_question(self):
+        # The answer is only sent with the reveal
+        question = self.questions[self.question_index]
+        return {'question': question.get('question'), 'options': question.get('options', [])}
+
+    def _member_list(self):
+        return [{'user_id': user_id, 'name': name} for user_id, name in self.members.items()]
+
+    def _score_list(self):
+        return sorted(
+            ({'user_id': user_id, 'name': name, 'score': self.scores.get(user_id, 0)}
+             for user_id, name in self.members.items()),
+            key=lambda entry: entry['score'], reverse=True
+        )
+
+    def _snapshot(self):
+        return {
+            'code': self.code,
+            'topic': self.topic,
+            'host_id': self.host_id,
+            'state': self.state,
+            'question_index': self.question_index,
+            'total_questions': len(self.questions),
+            'question': self._public_question() if self.state == 'question' else None,
+            'answered': len(self.answers),
+            'members': self._member_list(),
+            'scores': self._score_list(),
+            'results': self.results
+        }
+
+class RoomRegistry:
+    """All live rooms, by code. Rooms only exist in this process's memory."""
+
+    def __init__(self, quiz_source=None, room_ttl=ROOM_TTL_SECONDS, finished_ttl=FINISHED_TTL_SECONDS):
+        self.quiz_source = quiz_source
+        self.room_ttl = room_ttl
+        self.finished_ttl = finished_ttl
+        self._rooms = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app, quiz_source):
+        self.room_ttl = app.config.setdefault('ROOM_TTL_SECONDS', self.room_ttl)
+        self.quiz_source = quiz_source
+
+    def create(self, host_id, host_name, topic=None):
+        quiz = self.quiz_source(topic)
+        if not quiz or not quiz.get('questions'):
+            raise RoomError('Could not make a quiz for this room, please try again', 503)
+        self.prune()
+        with self._lock:
+            code = self._new_code()
+            room = self._rooms[code] = Room(code, host_id, quiz)
+        room.join(host_id, host_name)
+        return room
+
+    def get(self, code):
+        room = self._rooms.get((code or '').upper())
+        if room is None:
+            raise RoomError('No room with that code', 404)
+        return room
+
+    def prune(self, now=None):
+        """Drop idle rooms and finished rooms whose results have been shown"""
+        now = now or time.monotonic()
+        with self._lock:
+            expired = [
+                code for code, room in self._rooms.items()
+                if now - room.updated_at > (self.finished_ttl if room.state == 'finished' else self.room_ttl)
+            ]
+            closing = [self._rooms.pop(code) for code in expired]
+        for room in closing:
+            room.close()
+        return len(closing)
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def _new_code(self):
+        while True:
+            code = ''.join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+            if code not in self._rooms:
+                return code
+
+def save_results(room):
+    """Write every member's attempt and XP in one transaction; returns per-member results"""
+    results = []
+    attempts = []
+    members = room.final_scores()
+    try:
+        # Read before the first write, so the database write lock is held only
+        # for the inserts and increments below
+        users = {user.id: user for user in User.query.filter(User.id.in_([m[0] for m in members])).all()}
+        for user_id, name, score in members:
+            xp_earned = score * XP_PER_CORRECT * TEAM_XP_MULTIPLIER
+            attempts.append(QuizAttempt(user_id=user_id, topic=room.topic, score=score,
+                                        max_score=len(room.questions)))
+            results.append({'user_id': user_id, 'name': name, 'score': score, 'xp_earned': xp_earned})
+        db.session.add_all(attempts)
+
+        # Atomic increments, so a member's other XP in flight isn't lost
+        for result in results:
+            if result['xp_earned'] and result['user_id'] in users:
+                users[result['user_id']].add_xp(result['xp_earned'])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for attempt in attempts:
+        check_quiz_achievements(attempt)
+    return results
+
+registry = RoomRegistry()
+
+def _error(e):
+    return jsonify({'error': str(e)}), e.status
+
+@rooms.route('', methods=['POST'])
+@login_required
+@admission_required('quiz')
+def create_room():
+    try:
+        topic = ((request.json or {}).get('topic') or '').strip()[:100] or None
+        room = registry.create(current_user.id, current_user.first_name, topic)
+        return jsonify(room.snapshot()), 201
+    except RoomError as e:
+        return _error(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@rooms.route('/<code>')
+@login_required
+def get_room(code):
+    try:
+        return jsonify(registry.get(code).snapshot())
+    except RoomError as e:
+        return _error(e)
+
+@rooms.route('/<code>/join', methods=['POST'])
+@login_required
+def join_room(code):
+    try:
+        return jsonify(registry.get(code).join(current_user.id, current_user.first_name))
+    except RoomError as e:
+        return _error(e)
+
+@rooms.route('/<code>/leave', methods=['POST'])
+@login_required
+def leave_room(code):
+    try:
+        registry.get(code).leave(current_user.id)
+        return jsonify({'message': 'Left the room'})
+    except RoomError as e:
+        return _error(e)
+
+@rooms.route('/<code>/events')
+@login_required
+def room_events(code):
+    """Server-sent events for a room: state, joined, left, question, answered, reveal, finished.
+
+    Each open stream holds a server thread, so deploy behind a server with
+    cheap concurrency (e.g. gevent workers) for many rooms.
+    """
+    try:
+        room = registry.get(code)
+        subscriber = room.subscribe(current_user.id)
+    except RoomError as e:
+        return _error(e)
+
+    def stream():
+        try:
+            while True:
+                frame = subscriber.next()
+                if frame is None:
+                    break
+                yield frame
+        finally:
+            room.unsubscribe(subscriber)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@rooms.route('/<code>/start', methods=['POST'])
+@login_required
+def start_room(code):
+    try:
+        registry.get(code).start(current_user.id)
+        return jsonify({'message': 'Quiz started'})
+    except RoomError as e:
+        return _error(e)
+
+@rooms.route('/<code>/answer', methods=['POST'])
+@login_required
+def answer_question(code):
+    data = request.json or {}
+    if 'question_index' not in data or 'selected_answer' not in data:
+        return jsonify({'error': 'Missing question_index or selected_answer'}), 400
+    try:
+        correct = registry.get(code).answer(current_user.id, data['question_index'], data['selected_answer'])
+        return jsonify({'is_correct': correct})
+    except RoomError as e:
+        return _error(e)
+
+@rooms.route('/<code>/next', methods=['POST'])
+@login_required
+def next_question(code):
+    try:
+        room = registry.get(code)
+        if not room.advance(current_user.id):
+            return jsonify({'message': 'Next question'})
+        try:
+            results = save_results(room)
+        except Exception:
+            room.save_failed()
+            raise
+        room.finish(results)
+        return jsonify({'message': 'Quiz finished', 'results': results})
+    except RoomError as e:
+        return _error(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
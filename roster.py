@@ -0,0 +1,198 @@
+from flask import Blueprint, jsonify, request, current_app
+from models import db, User
+from auth import admin_required
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from email_validator import validate_email, EmailNotValidError
+from werkzeug.security import generate_password_hash
+import click
+import csv
+import io
+import multiprocessing
+import os
+import threading
+
+roster = Blueprint('roster', __name__)
+
+REQUIRED_COLUMNS = ['username', 'email', 'password', 'first_name']
+OPTIONAL_COLUMNS = ['last_name', 'age', 'parent_email']
+CHUNK_SIZE = 500
+
+def hash_password(password):
+    """Same hashing as auth.register; module-level so worker processes can run it"""
+    return generate_password_hash(password, method='pbkdf2:sha256')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _new_pool(workers=None):
+    # Spawned, not forked: a fork of the server copies its background threads'
+    # locks (recommender, prefetch, profiler) in whatever state they are in
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                               mp_context=multiprocessing.get_context('spawn'))
+
+def hash_pool(workers=None):
+    """The process pool shared by every upload, started on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _new_pool(workers)
+        return _pool
+
+def _clean_email(value):
+    return validate_email(value, check_deliverability=False).normalized
+
+def validate_row(row):
+    """Return (user fields, None) for a good row or (None, error message)"""
+    username = (row.get('username') or '').strip()
+    email = (row.get('email') or '').strip()
+    password = row.get('password') or ''
+    first_name = (row.get('first_name') or '').strip()
+
+    if not username or len(username) > 80:
+        return None, 'Username must be 1-80 characters'
+    if not first_name or len(first_name) > 80:
+        return None, 'First name must be 1-80 characters'
+    if len(password) < 6:
+        return None, 'Password must be at least 6 characters'
+    try:
+        email = _clean_email(email)
+    except EmailNotValidError as e:
+        return None, f'Invalid email: {str(e)}'
+
+    age = (row.get('age') or '').strip()
+    if age:
+        try:
+            age = int(age)
+        except ValueError:
+            return None, 'Age must be a whole number'
+    parent_email = (row.get('parent_email') or '').strip()
+    if parent_email:
+        try:
+            parent_email = _clean_email(parent_email)
+        except EmailNotValidError as e:
+            return None, f'Invalid parent email: {str(e)}'
+
+    return {
+        'username': username,
+        'email': email,
+        'password': password,
+        'first_name': first_name,
+        'last_name': (row.get('last_name') or '').strip() or None,
+        'age': age or None,
+        'parent_email': parent_email or None
+    }, None
+
+def _import_chunk(rows, pool, report):
+    """Validate, hash and insert one chunk of (line number, row) pairs in one transaction"""
+    valid = []
+    usernames, emails = set(), set()
+    for line, row in rows:
+        fields, error = validate_row(row)
+        if not error:
+            if fields['username'] in usernames:
+                error = 'Duplicate username in file'
+            elif fields['email'] in emails:
+                error = 'Duplicate email in file'
+        if error:
+            report['errors'].append({'line': line, 'username': row.get('username'), 'error': error})
+            continue
+        usernames.add(fields['username'])
+        emails.add(fields['email'])
+        valid.append((line, fields))
+
+    if not valid:
+        return
+
+    # One set-based lookup for every username and email in the chunk
+    taken_usernames, taken_emails = set(), set()
+    for username, email in db.session.query(User.username, User.email).filter(
+        db.or_(User.username.in_(usernames), User.email.in_(emails))
+    ):
+        taken_usernames.add(username)
+        taken_emails.add(email)
+
+    new_users = []
+    for line, fields in valid:
+        if fields['username'] in taken_usernames:
+            report['errors'].append({'line': line, 'username': fields['username'], 'error': 'Username already exists'})
+        elif fields['email'] in taken_emails:
+            report['errors'].append({'line': line, 'username': fields['username'], 'error': 'Email already registered'})
+        else:
+            new_users.append((line, fields))
+
+    if not new_users:
+        return
+
+    # pbkdf2 is deliberately slow, so spread it over the worker processes
+    hashes = pool.map(hash_password, [fields['password'] for _, fields in new_users])
+    now = datetime.now()
+    records = []
+    for (line, fields), hashed in zip(new_users, hashes):
+        record = dict(fields, _password=hashed, created_at=now, last_login=None,
+                      login_streak=1, level=1, total_xp=0)
+        del record['password']
+        records.append(record)
+
+    try:
+        # executemany insert of the whole chunk
+        db.session.execute(db.insert(User), records)
+        db.session.commit()
+        report['created'] += len(records)
+    except Exception as e:
+        db.session.rollback()
+        for line, fields in new_users:
+            report['errors'].append({'line': line, 'username': fields['username'], 'error': f'Insert failed: {str(e)}'})
+
+def import_roster(stream, pool, chunk_size=CHUNK_SIZE):
+    """Create users from a roster CSV read incrementally from a text stream,
+    hashing passwords on the given process pool"""
+    report = {'created': 0, 'errors': []}
+    reader = csv.DictReader(stream)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        report['errors'].append({'line': 1, 'username': None, 'error': f"Missing columns: {', '.join(missing)}"})
+        return report
+
+    chunk = []
+    # Line 1 is the header
+    for line, row in enumerate(reader, start=2):
+        chunk.append((line, row))
+        if len(chunk) >= chunk_size:
+            _import_chunk(chunk, pool, report)
+            chunk = []
+    if chunk:
+        _import_chunk(chunk, pool, report)
+
+    report['errors'].sort(key=lambda error: error['line'])
+    return report
+
+@roster.route('/import', methods=['POST'])
+@admin_required
+def import_upload():
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'error': 'No roster file provided'}), 400
+    try:
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        report = import_roster(
+            stream,
+            hash_pool(current_app.config.get('ROSTER_HASH_WORKERS')),
+            chunk_size=current_app.config.get('ROSTER_CHUNK_SIZE', CHUNK_SIZE)
+        )
+        return jsonify(report)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@roster.cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', default=CHUNK_SIZE, show_default=True)
+@click.option('--workers', type=int, default=None, help='Password hashing processes (default: CPU count).')
+def import_command(path, chunk_size, workers):
+    """Create accounts from a roster CSV at PATH."""
+    with open(path, encoding='utf-8-sig', newline='') as f, _new_pool(workers) as pool:
+        report = import_roster(f, pool, chunk_size=chunk_size)
+    print(f"Created {report['created']} users, {len(report['errors'])} rows rejected.")
+    for error in report['errors']:
+        print(f"  line {error['line']} ({error['username']}): {error['error']}")
@@ -0,0 +1,189 @@
+from flask import Blueprint, jsonify
+from auth import admin_required
+from collections import deque
+import os
+import threading
+import time
+
+routing = Blueprint('routing', __name__)
+
+# Model chains per task: the preferred model first, then faster fallbacks
+DEFAULT_ROUTES = {
+    'chat': ['mixtral-8x7b-32768', 'llama3-8b-8192'],
+    'topic_extraction': ['llama3-8b-8192', 'mixtral-8x7b-32768'],
+    'quiz': ['llama3-70b-8192', 'llama3-8b-8192'],
+    'summarization': ['llama3-8b-8192', 'mixtral-8x7b-32768'],
+}
+
+# p95 latency (seconds) above which a model is treated as degraded for a task
+DEFAULT_LATENCY_TARGETS = {
+    'chat': 8.0,
+    'topic_extraction': 2.0,
+    'quiz': 6.0,
+    'summarization': 10.0,
+}
+
+def groq_client(model_name):
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(groq_api_key=os.getenv('GROQ_API_KEY'), model_name=model_name)
+
+class ModelWindow:
+    """Latencies and failures of one model on one task over the last `seconds`"""
+
+    def __init__(self, seconds, max_samples=500):
+        self.seconds = seconds
+        self.samples = deque(maxlen=max_samples)  # (finished at, latency, ok)
+
+    def record(self, now, latency, ok):
+        self.samples.append((now, latency, ok))
+
+    def trim(self, now):
+        while self.samples and self.samples[0][0] < now - self.seconds:
+            self.samples.popleft()
+
+    def summary(self):
+        latencies = sorted(latency for _, latency, ok in self.samples if ok)
+        errors = sum(1 for _, _, ok in self.samples if not ok)
+        count = len(self.samples)
+        return {
+            'samples': count,
+            'p50': latencies[len(latencies) // 2] if latencies else None,
+            'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+            'error_rate': errors / count if count else 0.0,
+        }
+
+class ModelRouter:
+    """Routes each LLM task to a model from its configured chain.
+
+    Every call's latency and outcome is kept in a rolling window per task and
+    model, so long chat calls can't make a model look slow for quick topic
+    extraction. A model whose p95 on a task goes over that task's latency
+    target, or whose error rate gets too high, is skipped in favour of the
+    next one in the chain until its bad samples age out of the window. Failed calls fall through
+    to the next model straight away.
+    """
+
+    def __init__(self, routes=None, latency_targets=None, window_seconds=120, min_samples=5,
+                 max_error_rate=0.25, client_factory=groq_client, clock=time.monotonic):
+        self.routes = dict(routes or DEFAULT_ROUTES)
+        self.latency_targets = dict(latency_targets or DEFAULT_LATENCY_TARGETS)
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.client_factory = client_factory
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._windows = {}  # (task, model) -> ModelWindow
+
+    def init_app(self, app):
+        self.routes = dict(DEFAULT_ROUTES, **app.config.setdefault('LLM_ROUTES', {}))
+        self.latency_targets = dict(DEFAULT_LATENCY_TARGETS, **app.config.setdefault('LLM_LATENCY_TARGETS', {}))
+        self.window_seconds = app.config.setdefault('LLM_ROUTING_WINDOW_SECONDS', self.window_seconds)
+        self.max_error_rate = app.config.setdefault('LLM_MAX_ERROR_RATE', self.max_error_rate)
+
+    def client(self, model_name):
+        client = self._clients.get(model_name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(model_name)
+                if client is None:
+                    client = self._clients[model_name] = self.client_factory(model_name)
+        return client
+
+    def candidates(self, task):
+        """The task's chain, healthy models first in configured order, then the
+        degraded ones fastest first"""
+        chain = self.routes[task]
+        healthy, degraded = [], []
+        with self._lock:
+            for model in chain:
+                summary = self._window(task, model).summary()
+                if self._healthy(task, summary):
+                    healthy.append(model)
+                else:
+                    degraded.append((summary['error_rate'], summary['p95'] or 0.0, model))
+        return healthy + [model for _, _, model in sorted(degraded)]
+
+    def choose(self, task):
+        return self.candidates(task)[0]
+
+    def invoke(self, task, prompt):
+        """Call the best model for the task, falling back down the chain on errors"""
+        error = None
+        for model in self.candidates(task):
+            start = self.clock()
+            try:
+                response = self.client(model).invoke(prompt)
+            except Exception as e:
+                self._record(task, model, self.clock() - start, False)
+                print(f"Error from model {model} for {task}: {str(e)}")
+                error = e
+                continue
+            self._record(task, model, self.clock() - start, True)
+            return response
+        raise error
+
+    def stream(self, task, prompt):
+        """Stream from the best model; falls back only if a model fails before its first chunk"""
+        error = None
+        for model in self.candidates(task):
+            start = self.clock()
+            started = False
+            finished = False
+            try:
+                for chunk in self.client(model).stream(prompt):
+                    started = True
+                    yield chunk
+                finished = True
+            except GeneratorExit:
+                # The caller stopped reading (e.g. the safety filter); not the model's fault
+                raise
+            except Exception as e:
+                self._record(task, model, self.clock() - start, False)
+                if started:
+                    raise
+                print(f"Error from model {model} for {task}: {str(e)}")
+                error = e
+                continue
+            finally:
+                if finished:
+                    self._record(task, model, self.clock() - start, True)
+            return
+        raise error
+
+    def stats(self):
+        windows = {}
+        with self._lock:
+            for task, model in list(self._windows):
+                windows.setdefault(task, {})[model] = self._window(task, model).summary()
+        return {
+            'routes': {task: self.candidates(task) for task in self.routes},
+            'windows': windows,
+        }
+
+    def _record(self, task, model, latency, ok):
+        with self._lock:
+            self._window(task, model).record(self.clock(), latency, ok)
+
+    def _window(self, task, model):
+        window = self._windows.get((task, model))
+        if window is None:
+            window = self._windows[(task, model)] = ModelWindow(self.window_seconds)
+        window.trim(self.clock())
+        return window
+
+    def _healthy(self, task, summary):
+        if summary['samples'] < self.min_samples:
+            return True
+        if summary['error_rate'] > self.max_error_rate:
+            return False
+        return summary['p95'] is None or summary['p95'] <= self.latency_targets.get(task, float('inf'))
+
+model_router = ModelRouter()
+
+@routing.route('/stats')
+@admin_required
+def get_stats():
+    return jsonify(model_router.stats())
@@ -0,0 +1,228 @@
+import random
+import re
+import unicodedata
+
+# Blocked terms by category. Terms are normalized the same way as the text
+# they are matched against, so only list plain lowercase spellings here.
+DEFAULT_TERMS = {
+    'self_harm': [
+        'kill myself', 'kill yourself', 'killing myself', 'suicide', 'suicidal',
+        'self harm', 'cut myself', 'cutting myself', 'hurt myself', 'want to die',
+    ],
+    # Words Buddy uses innocently ("naked eye", "a murder of crows", "rockets
+    # shoot up", "birds get high") are only listed as unambiguous phrases
+    'violence': [
+        'murder someone', 'murder people', 'murder my', 'how to murder', 'behead', 'torture',
+        'make a bomb', 'build a bomb', 'shoot up a school', 'shoot up the school', 'school shooting',
+    ],
+    'sexual': [
+        'sex', 'sexy', 'porn', 'porno', 'pornography', 'nude', 'nudes', 'naked pictures',
+        'naked photos', 'naked pics', 'get naked', 'boobs', 'horny',
+    ],
+    'drugs': [
+        'cocaine', 'heroin', 'meth', 'marijuana', 'vape', 'vaping', 'get high on', 'getting high on',
+        'smoke weed',
+    ],
+    'profanity': [
+        'fuck', 'fucking', 'fucker', 'shit', 'shitty', 'bitch', 'asshole',
+        'bastard', 'cunt', 'whore', 'slut', 'wtf', 'stfu',
+    ],
+    'personal_info': [
+        'home address', 'my address is', 'phone number', 'credit card',
+        'social security number',
+    ],
+}
+
+# Buddy's own replies are scanned with a narrower list: it reminds kids not
+# to share their home address, and explains how temperature decides the sex
+# of a crocodile or what castles used torture chambers for
+OUTPUT_EXCLUDED_CATEGORIES = ('personal_info',)
+OUTPUT_EXCLUDED_TERMS = ('sex', 'torture')
+DEFAULT_OUTPUT_TERMS = {
+    category: [word for word in words if word not in OUTPUT_EXCLUDED_TERMS]
+    for category, words in DEFAULT_TERMS.items()
+    if category not in OUTPUT_EXCLUDED_CATEGORIES
+}
+DEFAULT_OUTPUT_TERMS['sexual'] += ['have sex', 'having sex', 'had sex']
+DEFAULT_OUTPUT_TERMS['violence'] += ['how to torture', 'torture someone', 'torture animals']
+
+DEFAULT_REDIRECTS = [
+    "Hmm, let's talk about something fun like animals instead! 🐶",
+    "That's not something I can chat about, but did you know octopuses have three hearts? 🐙 Want to learn more?",
+    "Let's pick a different topic! How about space, dinosaurs or volcanoes? 🚀",
+    "I'm not able to help with that one. If something is worrying you, please talk to a grown-up you trust. 💛 Want to explore something fun together?",
+]
+
+# Look-alike letters from other scripts mapped to their Latin twins
+CONFUSABLES = str.maketrans({
+    'а': 'a', 'в': 'b', 'е': 'e', 'к': 'k', 'м': 'm', 'н': 'h', 'о': 'o',
+    'р': 'p', 'с': 'c', 'т': 't', 'у': 'y', 'х': 'x', 'і': 'i', 'ј': 'j',
+    'ѕ': 's', 'ԁ': 'd', 'ɡ': 'g', 'ո': 'n', 'ս': 'u',
+    'α': 'a', 'β': 'b', 'ε': 'e', 'η': 'n', 'ι': 'i', 'κ': 'k', 'ν': 'v',
+    'ο': 'o', 'ρ': 'p', 'τ': 't', 'υ': 'u', 'χ': 'x',
+})
+
+# Leetspeak substitutions, applied only inside tokens that already have a
+# letter ("sh1t", "p0rn") so numbers and sums ("5 + 3 x 2") stay as they are
+LEET = str.maketrans({
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '8': 'b',
+    '@': 'a', '$': 's',
+})
+LEET_CHARS = re.compile(r'[0134578@$]')
+LEET_TOKEN = re.compile(r'[a-z0-9@$]*[a-z][a-z0-9@$]*')
+# ...and ones that are only letters between two letters ("sh!t", "f|ck")
+LEET_INNER = re.compile(r'(?<=[a-z])[!|](?=[a-z])')
+LEET_INNER_MAP = {'!': 'i', '|': 'i'}
+
+# Three or more single letters separated by spaces or a dot/dash/star: "s e x",
+# "k.i.l.l". Spaced-out operators ("a - b - c") and digits never join a run
+SPACED_LETTERS = re.compile(r'(?<![a-z0-9])[a-z](?:(?:\s+|[._*~-]\s*)[a-z]){2,}(?![a-z0-9])')
+NON_ALNUM = re.compile(r'[^a-z0-9]+')
+REPEATS = re.compile(r'([a-z])\1+')
+
+def normalize(text):
+    """Fold text into the canonical form the matcher runs on.
+
+    Strips accents, maps confusable letters and leetspeak inside words to
+    plain letters, joins spaced-out letters, collapses punctuation to single spaces and
+    squeezes repeated letters ("sooo" -> "so").
+    """
+    text = text.lower()
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+        text = text.translate(CONFUSABLES)
+    text = LEET_INNER.sub(lambda m: LEET_INNER_MAP[m.group(0)], text)
+    if LEET_CHARS.search(text):
+        text = LEET_TOKEN.sub(lambda m: m.group(0).translate(LEET), text)
+    text = SPACED_LETTERS.sub(lambda m: re.sub(r'[^a-z]', '', m.group(0)), text)
+    text = NON_ALNUM.sub(' ', text)
+    return REPEATS.sub(r'\1', text)
+
+class ContentBlocked(Exception):
+    """Raised when generated output trips the content filter"""
+
+    def __init__(self, match):
+        super().__init__(f"Blocked content ({match.category})")
+        self.match = match
+
+class Match:
+    __slots__ = ('term', 'category')
+
+    def __init__(self, term, category):
+        self.term = term
+        self.category = category
+
+    def __repr__(self):
+        return f"Match({self.term!r}, {self.category!r})"
+
+class ContentFilter:
+    """Local moderation built on precompiled alternations of all terms.
+
+    Kids' messages and Buddy's output each get their own term list; check()
+    matches messages, check_output() and scanner() match generated text.
+    """
+
+    def __init__(self, terms=None, redirects=None, output_terms=None):
+        self.redirects = list(redirects or DEFAULT_REDIRECTS)
+        self.compile(terms or DEFAULT_TERMS, output_terms or DEFAULT_OUTPUT_TERMS)
+
+    def init_app(self, app):
+        extra = app.config.get('SAFETY_EXTRA_TERMS', {})
+        terms = {category: list(words) for category, words in DEFAULT_TERMS.items()}
+        output_terms = {category: list(words) for category, words in DEFAULT_OUTPUT_TERMS.items()}
+        for category, words in extra.items():
+            terms.setdefault(category, []).extend(words)
+            output_terms.setdefault(category, []).extend(words)
+        self.compile(terms, output_terms)
+        self.redirects = list(app.config.get('SAFETY_REDIRECT_REPLIES') or DEFAULT_REDIRECTS)
+        self.enabled = app.config.get('SAFETY_FILTER_ENABLED', True)
+
+    def compile(self, terms, output_terms=None):
+        self.enabled = True
+        self._pattern, self._categories = self._compile_terms(terms)
+        self._output_pattern, self._output_categories = self._compile_terms(
+            terms if output_terms is None else output_terms
+        )
+        self.max_term_length = max((len(term) for term in self._output_categories), default=0)
+
+    @staticmethod
+    def _compile_terms(terms):
+        categories = {}
+        for category, words in terms.items():
+            for word in words:
+                normalized = normalize(word).strip()
+                if normalized:
+                    categories[normalized] = category
+                    # Spaced-out letters get joined across words ("k i l l m e")
+                    categories.setdefault(normalized.replace(' ', ''), category)
+        # Longest first so phrases win over their prefixes
+        alternation = '|'.join(
+            re.escape(term) for term in sorted(categories, key=len, reverse=True)
+        )
+        pattern = re.compile(r'(?<![a-z0-9])(?:' + alternation + r')(?![a-z0-9])')
+        return pattern, categories
+
+    def check(self, text):
+        """Return the first Match in a kid's message, or None if it's clean"""
+        return self._search(self._pattern, self._categories, text)
+
+    def check_output(self, text):
+        """Return the first Match in generated text, or None if it's clean"""
+        return self._search(self._output_pattern, self._output_categories, text)
+
+    def _search(self, pattern, categories, text):
+        if not self.enabled or not text:
+            return None
+        found = pattern.search(normalize(text))
+        if found:
+            return Match(found.group(0), categories[found.group(0)])
+        return None
+
+    def scanner(self):
+        """Stream scanner for generated output"""
+        return StreamScanner(self)
+
+    def redirect_reply(self):
+        return random.choice(self.redirects)
+
+class StreamScanner:
+    """Incrementally scan text that arrives in chunks (e.g. streamed LLM output).
+
+    Only a short tail of already-seen text is rescanned with each chunk, so the
+    cost per chunk is proportional to the chunk size. Matches touching the end
+    of the buffer are held back until more text arrives, so "meth" isn't
+    reported for a word that turns out to be "method".
+    """
+
+    def __init__(self, content_filter):
+        self.filter = content_filter
+        # Obfuscation (spacing, repeats) can make raw text longer than the term
+        self.window = content_filter.max_term_length * 4 + 16
+        self._tail = ''
+
+    def feed(self, chunk):
+        """Scan a new chunk, returning a Match or None"""
+        return self._scan(self._tail + chunk, final=False)
+
+    def finish(self):
+        """Scan whatever is still held back at the end of the stream"""
+        return self._scan(self._tail, final=True)
+
+    def _scan(self, text, final):
+        if not self.filter.enabled:
+            return None
+        normalized = normalize(text)
+        for found in self.filter._output_pattern.finditer(normalized):
+            if final or found.end() < len(normalized):
+                return Match(found.group(0), self.filter._output_categories[found.group(0)])
+        tail = text[-self.window:]
+        if len(text) > self.window:
+            # Start the tail on a word boundary so a partial word can't match
+            space = tail.find(' ')
+            if space >= 0:
+                tail = tail[space + 1:]
+        self._tail = tail
+        return None
+
+content_filter = ContentFilter()
@@ -0,0 +1,211 @@
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+from sqlalchemy import event, text
+from models import db, Activity, ActivityArchive, LearningSession, QuizAttempt
+from history import CHAT, decode_turn, read_archive, chats_archived
+from markupsafe import escape
+from datetime import datetime
+import json
+
+search = Blueprint('search', __name__)
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+ARCHIVED_CHAT = 'archived_chat'
+
+# snippet() marks matches with private-use characters; the text is HTML-escaped
+# before they are turned into <mark> tags, so chat text can't inject markup
+MARK_OPEN, MARK_CLOSE = '\ue000', '\ue001'
+
+# `owner` holds a per-user token ("u42") so a user's scope is an index lookup
+# rather than a filter over every match
+CREATE_INDEX_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    body,
+    owner,
+    kind UNINDEXED,
+    ref_id UNINDEXED,
+    created_at UNINDEXED,
+    tokenize = 'porter unicode61'
+)
+"""
+
+INSERT_SQL = text(
+    "INSERT INTO search_index (body, owner, kind, ref_id, created_at) "
+    "VALUES (:body, :owner, :kind, :ref_id, :created_at)"
+)
+
+SEARCH_SQL = text("""
+    SELECT kind, ref_id, created_at,
+           snippet(search_index, 0, :mark_open, :mark_close, '…', 16) AS snippet,
+           bm25(search_index, 1.0, 0.0) AS score
+    FROM search_index
+    WHERE search_index MATCH :query
+    ORDER BY score
+    LIMIT :limit OFFSET :offset
+""")
+
+# Scoped by owner first, so only that user's rows are visited
+ARCHIVE_CHATS_SQL = text(
+    "UPDATE search_index SET kind = :archived "
+    "WHERE search_index MATCH :owner AND kind = :chat AND ref_id IN (SELECT value FROM json_each(:ids))"
+)
+
+def owner_token(user_id):
+    return f'u{user_id}'
+
+def search_enabled():
+    return db.engine.dialect.name == 'sqlite'
+
+_created_for = set()
+
+def create_search_index():
+    """Create the FTS5 table (SQLite only)"""
+    if search_enabled():
+        db.session.execute(text(CREATE_INDEX_SQL))
+        db.session.commit()
+        _created_for.add(str(db.engine.url))
+
+def _index(connection, user_id, kind, ref_id, body, created_at):
+    if connection.dialect.name != 'sqlite' or not body:
+        return
+    # Databases created before search existed get the table on first write
+    url = str(connection.engine.url)
+    if url not in _created_for:
+        connection.execute(text(CREATE_INDEX_SQL))
+        _created_for.add(url)
+    connection.execute(INSERT_SQL, {
+        'body': body,
+        'owner': owner_token(user_id),
+        'kind': kind,
+        'ref_id': ref_id,
+        'created_at': created_at.isoformat() if created_at else None
+    })
+
+def index_quiz(user_id, quiz):
+    """Index the questions of a generated quiz (the caller commits)"""
+    if not search_enabled() or not quiz:
+        return
+    connection = db.session.connection()
+    topic = quiz.get('topic', '')
+    now = datetime.utcnow()
+    for question in quiz.get('questions', []):
+        body = ' '.join([topic, question.get('question', '')] + list(question.get('options', [])))
+        _index(connection, user_id, 'quiz_question', None, body, now)
+
+# Keep the index in sync as rows are written, inside the same transaction
+
+@event.listens_for(LearningSession, 'after_insert')
+def _index_learning_session(mapper, connection, session):
+    _index(connection, session.user_id, 'learning_session', session.id, session.topic, session.created_at)
+
+@event.listens_for(QuizAttempt, 'after_insert')
+def _index_quiz_attempt(mapper, connection, attempt):
+    _index(connection, attempt.user_id, 'quiz_attempt', attempt.id, attempt.topic, attempt.created_at)
+
+@event.listens_for(Activity, 'after_insert')
+def _index_activity(mapper, connection, activity):
+    # Redirected turns stay out of search: they're about what Buddy won't discuss
+    if activity.activity_type != CHAT or (activity.activity_metadata or {}).get('redirected'):
+        return
+    turn = decode_turn(activity.id, activity.created_at, activity.content, activity.activity_metadata)
+    _index(connection, activity.user_id, CHAT, activity.id, _turn_body(turn), activity.created_at)
+
+def _turn_body(turn):
+    return '\n'.join(filter(None, [turn['user'], turn['buddy']]))
+
+@chats_archived.connect
+def _on_chats_archived(user_id, ids=(), **extra):
+    # The turns now live in a monthly archive blob; keep them searchable under
+    # their old ids (the result's created_at says which month to open)
+    if not search_enabled() or not ids:
+        return
+    db.session.execute(ARCHIVE_CHATS_SQL, {
+        'archived': ARCHIVED_CHAT, 'chat': CHAT, 'owner': f'owner:{owner_token(user_id)}',
+        'ids': json.dumps(list(ids))
+    })
+
+def build_match_query(user_id, raw_query):
+    """Turn free text into a safe FTS5 query scoped to one user.
+
+    Each word becomes a quoted prefix term, so user input can't inject FTS5
+    syntax, and the owner token restricts matches to the user's own rows.
+    """
+    words = [word.replace('"', '') for word in raw_query.split()]
+    terms = ' '.join(f'"{word}"*' for word in words if word)
+    if not terms:
+        return None
+    return f'owner:{owner_token(user_id)} AND body:({terms})'
+
+def highlight(snippet):
+    """Escape a snippet and turn the match markers into <mark> tags"""
+    if snippet is None:
+        return None
+    return str(escape(snippet)).replace(MARK_OPEN, '<mark>').replace(MARK_CLOSE, '</mark>')
+
+def search_user(user_id, raw_query, limit=DEFAULT_LIMIT, offset=0):
+    match = build_match_query(user_id, raw_query)
+    if match is None:
+        return []
+    rows = db.session.execute(SEARCH_SQL, {
+        'query': match, 'limit': limit, 'offset': offset, 'mark_open': MARK_OPEN, 'mark_close': MARK_CLOSE
+    })
+    return [
+        {
+            'kind': row.kind,
+            'ref_id': row.ref_id,
+            'created_at': row.created_at,
+            'snippet': highlight(row.snippet),
+            'score': round(-row.score, 4)
+        }
+        for row in rows
+    ]
+
+@search.route('')
+@login_required
+def search_history():
+    if not search_enabled():
+        return jsonify({'error': 'Search is not available'}), 501
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'No search query provided'}), 400
+        limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        return jsonify({
+            'query': query,
+            'results': search_user(current_user.id, query, limit=limit, offset=offset)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@search.cli.command('rebuild')
+def rebuild_command():
+    """Recreate the search index from existing sessions, quizzes and chats."""
+    if not search_enabled():
+        print("Search needs SQLite with FTS5.")
+        return
+    db.session.execute(text(CREATE_INDEX_SQL))
+    # Generated quiz questions aren't stored anywhere else, so keep those rows
+    db.session.execute(text("DELETE FROM search_index WHERE kind != 'quiz_question'"))
+    connection = db.session.connection()
+
+    for model, kind, topic_of in (
+        (LearningSession, 'learning_session', lambda row: row.topic),
+        (QuizAttempt, 'quiz_attempt', lambda row: row.topic),
+    ):
+        for row in model.query.yield_per(1000):
+            _index(connection, row.user_id, kind, row.id, topic_of(row), row.created_at)
+
+    for activity in Activity.query.filter_by(activity_type=CHAT).yield_per(1000):
+        _index_activity(None, connection, activity)
+
+    for archive in ActivityArchive.query.filter_by(activity_type=CHAT).yield_per(100):
+        for turn in read_archive(archive):
+            if turn.get('redirected'):
+                continue
+            created_at = datetime.fromisoformat(turn['created_at']) if turn.get('created_at') else None
+            _index(connection, archive.user_id, ARCHIVED_CHAT, turn.get('id'), _turn_body(turn), created_at)
+
+    db.session.commit()
+    print("Search index rebuilt.")
@@ -138,7 +138,8 @@ document.addEventListener('DOMContentLoaded', () => {
                     is_last_question: isLastQuestion,
                     current_score: quizScore,
                     total_questions: currentQuiz.questions.length,
-                    topic: currentQuiz.topic
+                    topic: currentQuiz.topic,
+                    review_key: question.review_key
                 })
             });
             
@@ -313,6 +314,11 @@ document.addEventListener('DOMContentLoaded', () => {
             
             const data = await response.json();
             
+            if (response.status === 429) {
+                addMessage(data.error, false);
+                return;
+            }
+            
             if (data.error) {
                 addMessage('Sorry, there was an error processing your message. Please try again.', false);
                 return;
@@ -354,6 +360,11 @@ document.addEventListener('DOMContentLoaded', () => {
             const response = await fetch('/generate_quiz');
             const data = await response.json();
             
+            if (response.status === 429) {
+                addMessage(data.error, false);
+                return;
+            }
+            
             if (data.error) {
                 addMessage('Sorry, I could not generate a quiz right now. Please try again later.', false);
                 return;